@@ -1 +1,24 @@
 # vindicta-economy: Ledger, Quotas, and Gas Tank
+"""
+Subpackages are imported on first attribute access, so `import vindicta_economy`
+stays cheap for short-lived workers that only need part of the package.
+"""
+
+import importlib
+from typing import Any, List
+
+_SUBMODULES = ("achievements", "governor", "ledger", "models", "simulation")
+
+__all__ = list(_SUBMODULES)
+
+
+def __getattr__(name: str) -> Any:
+    if name in _SUBMODULES:
+        module = importlib.import_module(f"{__name__}.{name}")
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_SUBMODULES))
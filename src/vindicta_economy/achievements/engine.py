@@ -0,0 +1,263 @@
+
+import asyncio
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterable, Dict, Iterable, List, Optional, Set, Tuple
+
+from vindicta_economy.ledger.atomic_credits import AtomicLedger, SQL_BATCH_SIZE
+from vindicta_economy.models import Achievement, AchievementType
+
+# Achievement types whose events report an absolute value (the current streak)
+# rather than an increment. Progress keeps the best value seen.
+ABSOLUTE_PROGRESS_TYPES = frozenset({AchievementType.STREAK})
+
+REWARD_ACTION_TYPE = "achievement_reward"
+
+@dataclass
+class GameEvent:
+    user_id: str
+    achievement_type: AchievementType
+    amount: int = 1  # Increment, or the absolute value for ABSOLUTE_PROGRESS_TYPES
+
+@dataclass
+class AchievementUnlock:
+    user_id: str
+    achievement_id: str
+    name: str
+    reward_amount: int
+    unlocked_at: float
+
+class AchievementEngine:
+    """
+    Incremental achievement evaluation over a stream of game events.
+
+    Definitions are indexed by AchievementType so each event only touches
+    the achievements it can advance. Progress lives in compact in-memory
+    counters, loaded per user on first sight and written back in batches
+    by flush(), which also credits unlock rewards through the ledger in the
+    same storage transaction.
+
+    At most max_cached_users users are kept in memory; beyond that the least
+    recently seen users with nothing left to flush are evicted and reloaded
+    from the database on their next event.
+    """
+
+    def __init__(self, ledger: AtomicLedger, definitions: Iterable[Achievement],
+                 flush_threshold: int = 1000, max_cached_users: int = 100_000):
+        self.ledger = ledger
+        self.flush_threshold = flush_threshold
+        self.max_cached_users = max_cached_users
+        self._definitions: Dict[str, Achievement] = {}
+        self._by_type: Dict[AchievementType, List[Tuple[str, Achievement]]] = {}
+        for achievement in definitions:
+            achievement_id = str(achievement.id)
+            self._definitions[achievement_id] = achievement
+            self._by_type.setdefault(achievement.achievement_type, []).append(
+                (achievement_id, achievement)
+            )
+        # (user_id, achievement_id) -> progress
+        self._progress: Dict[Tuple[str, str], int] = {}
+        self._unlocked: Dict[Tuple[str, str], float] = {}
+        self._loaded_users: "OrderedDict[str, None]" = OrderedDict()  # Least recently seen first
+        self._dirty: Set[Tuple[str, str]] = set()
+        self._pending_unlocks: List[AchievementUnlock] = []
+        self._schema_ready = False
+
+    def _init_db(self) -> None:
+        if self._schema_ready:
+            return
+        with self.ledger._connect() as conn:
+            self._create_table(conn)
+            conn.commit()
+        self._schema_ready = True
+
+    @staticmethod
+    def _create_table(conn: sqlite3.Connection) -> None:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS achievement_progress (
+                user_id TEXT NOT NULL,
+                achievement_id TEXT NOT NULL,
+                progress INTEGER NOT NULL,
+                unlocked_at REAL,
+                PRIMARY KEY (user_id, achievement_id)
+            ) WITHOUT ROWID
+        ''')
+
+    @property
+    def pending_writes(self) -> int:
+        return len(self._dirty)
+
+    def apply(self, event: GameEvent) -> List[AchievementUnlock]:
+        """
+        Apply one event to in-memory progress. The user's persisted progress
+        must already be loaded (process() takes care of that).
+        Returns the achievements unlocked by this event.
+        """
+        unlocks: List[AchievementUnlock] = []
+        absolute = event.achievement_type in ABSOLUTE_PROGRESS_TYPES
+        for achievement_id, achievement in self._by_type.get(event.achievement_type, ()):
+            key = (event.user_id, achievement_id)
+            if key in self._unlocked:
+                continue
+            current = self._progress.get(key, 0)
+            progress = max(current, event.amount) if absolute else current + event.amount
+            if progress == current:
+                continue
+            self._progress[key] = progress
+            self._dirty.add(key)
+            if progress >= achievement.threshold:
+                unlocked_at = time.time()
+                self._unlocked[key] = unlocked_at
+                unlocks.append(AchievementUnlock(
+                    user_id=event.user_id,
+                    achievement_id=achievement_id,
+                    name=achievement.name,
+                    reward_amount=achievement.reward_amount,
+                    unlocked_at=unlocked_at,
+                ))
+        self._pending_unlocks.extend(unlocks)
+        return unlocks
+
+    async def process(self, events: Iterable[GameEvent]) -> List[AchievementUnlock]:
+        """Load any unseen users, apply a batch of events and flush if due."""
+        events = list(events)
+        new_users = {e.user_id for e in events if e.user_id not in self._loaded_users}
+        if new_users:
+            if not self._schema_ready:
+                await self.ledger._run_write(self._init_db)
+            await self.ledger._run_sync(self._load_users_sync, list(new_users))
+        unlocks: List[AchievementUnlock] = []
+        for event in events:
+            self._loaded_users.move_to_end(event.user_id)
+            unlocks.extend(self.apply(event))
+        if len(self._dirty) >= self.flush_threshold:
+            await self.flush()
+        self._evict()
+        return unlocks
+
+    async def run(self, source: AsyncIterable[GameEvent], batch_size: int = 500) -> None:
+        """Consume an event stream until it ends, then flush."""
+        batch: List[GameEvent] = []
+        async for event in source:
+            batch.append(event)
+            if len(batch) >= batch_size:
+                await self.process(batch)
+                batch = []
+        if batch:
+            await self.process(batch)
+        await self.flush()
+
+    def _load_users_sync(self, user_ids: List[str]) -> None:
+        with self.ledger._connect() as conn:
+            cursor = conn.cursor()
+            for i in range(0, len(user_ids), SQL_BATCH_SIZE):
+                chunk = user_ids[i:i + SQL_BATCH_SIZE]
+                cursor.execute(f"""
+                    SELECT user_id, achievement_id, progress, unlocked_at
+                    FROM achievement_progress
+                    WHERE user_id IN ({','.join('?' * len(chunk))})
+                """, chunk)
+                for user_id, achievement_id, progress, unlocked_at in cursor:
+                    key = (user_id, achievement_id)
+                    self._progress[key] = progress
+                    if unlocked_at is not None:
+                        self._unlocked[key] = unlocked_at
+        self._loaded_users.update(dict.fromkeys(user_ids))
+
+    async def flush(self) -> List[AchievementUnlock]:
+        """
+        Persist dirty progress counters and credit pending unlock rewards.
+        Both are committed in one storage transaction, so an unlock is never
+        recorded without its reward. If the write fails, everything stays
+        pending and the next flush() retries it.
+        """
+        if not self._dirty and not self._pending_unlocks:
+            return []
+        rows = [
+            (user_id, achievement_id, self._progress[(user_id, achievement_id)],
+             self._unlocked.get((user_id, achievement_id)))
+            for user_id, achievement_id in self._dirty
+        ]
+        unlocks, self._pending_unlocks = self._pending_unlocks, []
+        dirty, self._dirty = self._dirty, set()
+
+        rewards = [(u.user_id, float(u.reward_amount)) for u in unlocks if u.reward_amount > 0]
+        # Run the write to completion even if we are cancelled, so we always
+        # know whether the batch was committed
+        write = asyncio.ensure_future(self._write_batch(rows, rewards))
+        cancelled = False
+        while not write.done():
+            try:
+                await asyncio.wait({write})  # Never cancels write or raises its error
+            except asyncio.CancelledError:
+                cancelled = True
+        error = asyncio.CancelledError() if write.cancelled() else write.exception()
+        if error is not None:
+            # Not committed: keep it pending ahead of anything applied meanwhile
+            self._pending_unlocks[:0] = unlocks
+            self._dirty |= dirty
+            raise error
+        if cancelled:
+            raise asyncio.CancelledError()
+        self._evict()
+        return unlocks
+
+    async def _write_batch(self, rows: List[Tuple[str, str, int, Optional[float]]],
+                           rewards: List[Tuple[str, float]]) -> None:
+        if rewards:
+            await self.ledger.credit_accounts(
+                rewards, action_type=REWARD_ACTION_TYPE,
+                extra_writes=lambda conn: self._write_rows(conn, rows),
+            )
+        else:
+            await self.ledger._run_write(self._write_progress_sync, rows)
+
+    def _write_progress_sync(self, rows: List[Tuple[str, str, int, Optional[float]]]) -> None:
+        with self.ledger._connect() as conn:
+            self._write_rows(conn, rows)
+            conn.commit()
+
+    def _write_rows(self, conn: sqlite3.Connection, rows: List[Tuple[str, str, int, Optional[float]]]) -> None:
+        self._create_table(conn)
+        conn.executemany("""
+            INSERT INTO achievement_progress (user_id, achievement_id, progress, unlocked_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id, achievement_id) DO UPDATE SET
+            progress = excluded.progress,
+            unlocked_at = excluded.unlocked_at
+        """, rows)
+
+    def _evict(self) -> None:
+        """Drop the least recently seen users with nothing left to flush."""
+        excess = len(self._loaded_users) - self.max_cached_users
+        if excess <= 0:
+            return
+        busy = {user_id for user_id, _ in self._dirty}
+        busy.update(u.user_id for u in self._pending_unlocks)
+        evicted: List[str] = []
+        for user_id in self._loaded_users:
+            if len(evicted) >= excess:
+                break
+            if user_id not in busy:
+                evicted.append(user_id)
+        for user_id in evicted:
+            del self._loaded_users[user_id]
+            for achievement_id in self._definitions:
+                self._progress.pop((user_id, achievement_id), None)
+                self._unlocked.pop((user_id, achievement_id), None)
+
+    def progress_for(self, user_id: str) -> List[Achievement]:
+        """Per-user copies of every definition with progress filled in (loaded users only)."""
+        result = []
+        for achievement_id, achievement in self._definitions.items():
+            key = (user_id, achievement_id)
+            unlocked_at = self._unlocked.get(key)
+            result.append(achievement.model_copy(update={
+                "user_progress": self._progress.get(key, 0),
+                "unlocked": unlocked_at is not None,
+                "unlocked_at": datetime.fromtimestamp(unlocked_at) if unlocked_at else None,
+            }))
+        return result
@@ -0,0 +1,149 @@
+
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Deque, Dict, Optional
+
+from vindicta_economy.governor.policy import PriorityLevel
+
+if TYPE_CHECKING:
+    from vindicta_economy.ledger.atomic_credits import AtomicLedger
+
+# Never shed; everything below it is shed lowest priority first
+_UNSHEDDABLE = PriorityLevel.SYSTEM_CRITICAL
+
+@dataclass
+class AdmissionConfig:
+    target_p99_seconds: float = 0.050  # Ledger write latency (lock wait + commit)
+    max_queue_depth: int = 32          # Writes waiting on or holding the ledger lock
+    interval_seconds: float = 1.0      # How often the controller re-evaluates
+    increase_step: float = 0.05        # Additive increase per healthy interval
+    decrease_factor: float = 0.5       # Multiplicative decrease per breached interval
+    min_probability: float = 0.01      # Floor, so shed levels still trickle through
+    max_samples: int = 1024            # Latency samples kept per interval
+
+@dataclass
+class AdmissionState:
+    """Point-in-time view of the controller, for dashboards and health checks."""
+    p99_seconds: Optional[float]  # Over the last evaluated interval; None without samples
+    queue_depth: int
+    probabilities: Dict[str, float]
+    admitted: Dict[str, int]
+    shed: Dict[str, int]
+    decreases: int = 0
+    increases: int = 0
+    target_p99_seconds: float = 0.0
+
+@dataclass
+class _LevelStats:
+    probability: float = 1.0
+    admitted: int = 0
+    shed: int = 0
+
+class AdmissionController:
+    """
+    AIMD admission control driven by observed ledger latency and queue depth.
+
+    Each interval the p99 of the write latencies observed since the last
+    evaluation is compared with the target. On a breach (p99 or queue depth
+    over target) the lowest priority level still above the floor has its
+    admission probability cut multiplicatively; otherwise the highest level
+    below 1.0 is raised additively. Load is therefore shed from
+    BACKGROUND_SIMULATION first and restored to it last. SYSTEM_CRITICAL is
+    always admitted.
+
+    Feed it with attach(ledger), or call observe() from any other source.
+    """
+
+    def __init__(self, config: AdmissionConfig = AdmissionConfig(),
+                 rng: Callable[[], float] = random.random,
+                 clock: Callable[[], float] = time.monotonic):
+        self.config = config
+        self._rng = rng
+        self._clock = clock
+        self._levels: Dict[PriorityLevel, _LevelStats] = {p: _LevelStats() for p in PriorityLevel}
+        self._samples: Deque[float] = deque(maxlen=config.max_samples)
+        self._queue_depth = 0
+        self._depth_source: Optional[Callable[[], int]] = None
+        self._p99: Optional[float] = None
+        self._next_evaluation = clock() + config.interval_seconds
+        self._decreases = 0
+        self._increases = 0
+
+    def attach(self, ledger: "AtomicLedger") -> None:
+        """Observe a ledger's write latencies and read its live queue depth."""
+        ledger.add_latency_observer(self.observe)
+        self._depth_source = lambda: ledger.pending_writes
+
+    def observe(self, latency_seconds: float, queue_depth: int) -> None:
+        """Record one completed write and the queue depth left behind it."""
+        self._samples.append(latency_seconds)
+        self._queue_depth = queue_depth
+
+    def probability(self, priority: PriorityLevel) -> float:
+        return self._levels[priority].probability
+
+    def admit(self, priority: PriorityLevel) -> bool:
+        """Decide whether to admit one operation at `priority`."""
+        self._maybe_evaluate()
+        level = self._levels[priority]
+        if priority >= _UNSHEDDABLE or self._rng() < level.probability:
+            level.admitted += 1
+            return True
+        level.shed += 1
+        return False
+
+    def snapshot(self) -> AdmissionState:
+        return AdmissionState(
+            p99_seconds=self._p99,
+            queue_depth=self._current_depth(),
+            probabilities={p.name: s.probability for p, s in self._levels.items()},
+            admitted={p.name: s.admitted for p, s in self._levels.items()},
+            shed={p.name: s.shed for p, s in self._levels.items()},
+            decreases=self._decreases,
+            increases=self._increases,
+            target_p99_seconds=self.config.target_p99_seconds,
+        )
+
+    def _current_depth(self) -> int:
+        return self._depth_source() if self._depth_source is not None else self._queue_depth
+
+    def _maybe_evaluate(self) -> None:
+        now = self._clock()
+        if now < self._next_evaluation:
+            return
+        self._next_evaluation = now + self.config.interval_seconds
+        if self._samples:
+            ordered = sorted(self._samples)
+            self._p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+            self._samples.clear()
+        else:
+            self._p99 = None  # Nothing written; only queue depth can signal trouble
+        breached = (
+            (self._p99 is not None and self._p99 > self.config.target_p99_seconds)
+            or self._current_depth() > self.config.max_queue_depth
+        )
+        if breached:
+            self._decrease()
+        else:
+            self._increase()
+
+    def _decrease(self) -> None:
+        for priority in sorted(self._levels):
+            level = self._levels[priority]
+            if priority >= _UNSHEDDABLE:
+                break
+            if level.probability > self.config.min_probability:
+                level.probability = max(self.config.min_probability,
+                                        level.probability * self.config.decrease_factor)
+                self._decreases += 1
+                return
+
+    def _increase(self) -> None:
+        for priority in sorted(self._levels, reverse=True):
+            level = self._levels[priority]
+            if level.probability < 1.0:
+                level.probability = min(1.0, level.probability + self.config.increase_step)
+                self._increases += 1
+                return
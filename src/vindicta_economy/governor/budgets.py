@@ -0,0 +1,211 @@
+
+import asyncio
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, ContextManager, Dict, List, Optional, Set, Tuple, TypeVar
+
+from vindicta_economy.governor.quotas import OperationType
+
+if TYPE_CHECKING:
+    from vindicta_economy.ledger.atomic_credits import AtomicLedger
+
+_T = TypeVar("_T")
+
+@dataclass
+class BudgetLimit:
+    limit_cc: float
+    window_seconds: float = 60.0
+
+class RollingWindow:
+    """
+    Spend over a sliding time window, kept as a ring buffer of fixed-width
+    buckets plus a running total. Reads and writes are O(1) amortized.
+    """
+    __slots__ = ("bucket_seconds", "totals", "epoch", "total")
+
+    def __init__(self, window_seconds: float, buckets: int = 60):
+        self.bucket_seconds = window_seconds / buckets
+        self.totals: List[float] = [0.0] * buckets
+        self.epoch = 0  # Absolute index of the newest bucket
+        self.total = 0.0
+
+    def _advance(self, now: float) -> None:
+        current = int(now // self.bucket_seconds)
+        gap = current - self.epoch
+        if gap <= 0:
+            return
+        size = len(self.totals)
+        if gap >= size:
+            self.totals = [0.0] * size
+            self.total = 0.0
+        else:
+            for i in range(1, gap + 1):
+                idx = (self.epoch + i) % size
+                self.total -= self.totals[idx]
+                self.totals[idx] = 0.0
+        self.epoch = current
+
+    def spent(self, now: float) -> float:
+        self._advance(now)
+        return max(self.total, 0.0)
+
+    def add(self, amount: float, now: float) -> None:
+        self._advance(now)
+        self.totals[self.epoch % len(self.totals)] += amount
+        self.total += amount
+
+class QuotaBudgets:
+    """
+    Rolling-window spend budgets per agent and OperationType.
+
+    Limits are set per OperationType, optionally overridden per agent. Only
+    (agent, operation) pairs with a limit are tracked, so unconfigured
+    operations cost nothing. Windows live in memory and are written to the
+    ledger database by persist(); call load() once at startup to restore them.
+    Given a ledger, storage goes through its connections and write path
+    (the shared writer thread for pooled ledgers) instead of db_path.
+    """
+
+    def __init__(self, limits: Optional[Dict[OperationType, BudgetLimit]] = None,
+                 db_path: Optional[str] = None, buckets: int = 60,
+                 persist_interval: float = 30.0, clock: Callable[[], float] = time.time,
+                 ledger: Optional["AtomicLedger"] = None):
+        self.ledger = ledger
+        self.db_path = ledger.db_path if ledger is not None and db_path is None else db_path
+        self.buckets = buckets
+        self.persist_interval = persist_interval
+        self._clock = clock
+        self._limits: Dict[OperationType, BudgetLimit] = dict(limits or {})
+        self._agent_limits: Dict[Tuple[str, OperationType], BudgetLimit] = {}
+        self._windows: Dict[Tuple[str, OperationType], RollingWindow] = {}
+        self._dirty: Set[Tuple[str, OperationType]] = set()
+        self._last_persist = clock()
+        self._table_ready = False
+
+    def set_limit(self, op_type: OperationType, limit: BudgetLimit, agent_id: Optional[str] = None) -> None:
+        """Set the default limit for an operation, or an override for one agent."""
+        if agent_id is None:
+            self._limits[op_type] = limit
+        else:
+            self._agent_limits[(agent_id, op_type)] = limit
+
+    def limit_for(self, agent_id: str, op_type: OperationType) -> Optional[BudgetLimit]:
+        return self._agent_limits.get((agent_id, op_type)) or self._limits.get(op_type)
+
+    def _window(self, agent_id: str, op_type: OperationType, limit: BudgetLimit) -> RollingWindow:
+        key = (agent_id, op_type)
+        window = self._windows.get(key)
+        if window is None:
+            window = self._windows[key] = RollingWindow(limit.window_seconds, self.buckets)
+        return window
+
+    def spent(self, agent_id: str, op_type: OperationType) -> float:
+        window = self._windows.get((agent_id, op_type))
+        return window.spent(self._clock()) if window else 0.0
+
+    def would_exceed(self, agent_id: str, op_type: OperationType, amount: float) -> bool:
+        return self.exceeded_limit(agent_id, op_type, amount) is not None
+
+    def exceeded_limit(self, agent_id: str, op_type: OperationType, amount: float) -> Optional[BudgetLimit]:
+        """The limit that spending `amount` more would break, or None if it fits."""
+        limit = self.limit_for(agent_id, op_type)
+        if limit is None or self.spent(agent_id, op_type) + amount <= limit.limit_cc:
+            return None
+        return limit
+
+    def record(self, agent_id: str, op_type: OperationType, amount: float) -> None:
+        """Count completed spend against the agent's window (no-op if unlimited)."""
+        limit = self.limit_for(agent_id, op_type)
+        if limit is None:
+            return
+        self._window(agent_id, op_type, limit).add(amount, self._clock())
+        self._dirty.add((agent_id, op_type))
+
+    def persist_due(self) -> bool:
+        return bool(self._dirty) and self._clock() - self._last_persist >= self.persist_interval
+
+    async def persist(self) -> None:
+        """Write changed windows to the database."""
+        if self.db_path is None or not self._dirty:
+            return
+        rows = []
+        for agent_id, op_type in self._dirty:
+            window = self._windows[(agent_id, op_type)]
+            rows.append((agent_id, op_type.value, window.epoch, json.dumps(window.totals),
+                         window.bucket_seconds))
+        self._dirty = set()
+        self._last_persist = self._clock()
+        await self._run_write(self._persist_sync, rows)
+
+    async def _run_write(self, fn: Callable[..., _T], *args: Any) -> _T:
+        if self.ledger is not None:
+            return await self.ledger._run_write(fn, *args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, fn, *args)
+
+    def _connect(self) -> ContextManager[sqlite3.Connection]:
+        if self.ledger is not None:
+            return self.ledger._connect()
+        assert self.db_path is not None  # persist() and load() return early without one
+        return sqlite3.connect(self.db_path)
+
+    def _persist_sync(self, rows: List[Tuple[str, str, int, str, float]]) -> None:
+        with self._connect() as conn:
+            self._create_table(conn)
+            conn.executemany("""
+                INSERT INTO quota_windows (agent_id, op_type, epoch, buckets, bucket_seconds)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(agent_id, op_type) DO UPDATE SET
+                epoch = excluded.epoch,
+                buckets = excluded.buckets,
+                bucket_seconds = excluded.bucket_seconds
+            """, rows)
+            conn.commit()
+
+    async def load(self) -> None:
+        """Restore persisted windows, e.g. after a restart."""
+        if self.db_path is None:
+            return
+        # May create the table, so it takes the write path too
+        rows = await self._run_write(self._load_sync)
+        for agent_id, op_value, epoch, buckets, bucket_seconds in rows:
+            op_type = OperationType(op_value)
+            limit = self.limit_for(agent_id, op_type)
+            totals = json.loads(buckets)
+            if limit is None or len(totals) != self.buckets:
+                continue  # Limit removed or bucket layout changed since the save
+            if bucket_seconds != limit.window_seconds / self.buckets:
+                continue  # Window length changed: epoch counts buckets of another width
+            window = self._window(agent_id, op_type, limit)
+            window.totals = totals
+            window.epoch = epoch
+            window.total = sum(totals)
+
+    def _load_sync(self) -> List[Tuple[str, str, int, str, Optional[float]]]:
+        with self._connect() as conn:
+            self._create_table(conn)
+            rows: List[Tuple[str, str, int, str, Optional[float]]] = conn.execute(
+                "SELECT agent_id, op_type, epoch, buckets, bucket_seconds FROM quota_windows"
+            ).fetchall()
+            return rows
+
+    def _create_table(self, conn: sqlite3.Connection) -> None:
+        if self._table_ready:
+            return
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS quota_windows (
+                agent_id TEXT NOT NULL,
+                op_type TEXT NOT NULL,
+                epoch INTEGER NOT NULL,
+                buckets TEXT NOT NULL,
+                bucket_seconds REAL,
+                PRIMARY KEY (agent_id, op_type)
+            )
+        ''')
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(quota_windows)")}
+        if "bucket_seconds" not in columns:
+            # Saved before widths were recorded; those rows load as unknown and are skipped
+            conn.execute("ALTER TABLE quota_windows ADD COLUMN bucket_seconds REAL")
+        self._table_ready = True
@@ -1,10 +1,14 @@
 
 from enum import IntEnum
 from dataclasses import dataclass
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-from vindicta_economy.ledger.manager import VoidBankerManager
-from vindicta_economy.governor.quotas import HardwareStateProtocol
+from vindicta_economy.governor.quotas import HardwareStateProtocol, OperationType
+
+if TYPE_CHECKING:
+    # Only needed for annotations; importing it at runtime drags in the ledger and pydantic
+    from vindicta_economy.governor.admission import AdmissionController
+    from vindicta_economy.ledger.manager import VoidBankerManager
 
 class PriorityLevel(IntEnum):
     BACKGROUND_SIMULATION = 0
@@ -14,7 +18,10 @@ class PriorityLevel(IntEnum):
 
 class ResourceExhaustionHalt(Exception):
     """Raised when the system enters a critical resource state."""
-    pass
+
+    def __init__(self, detail: str, reason: Optional[str] = None):
+        super().__init__(f"{reason}: {detail}" if reason is not None else detail)
+        self.reason = reason or "UNSPECIFIED"  # e.g. "INSOLVENCY"; stable for counting denials
 
 @dataclass
 class PolicyConfig:
@@ -23,14 +30,19 @@ class PolicyConfig:
     min_solvency_buffer: float = 10.0      # Minimum credits required to operate
 
 class ResourcePolicy:
-    def __init__(self, manager: VoidBankerManager, config: PolicyConfig = PolicyConfig()):
+    def __init__(self, manager: "VoidBankerManager", config: PolicyConfig = PolicyConfig(),
+                 admission: Optional["AdmissionController"] = None):
         self.manager = manager
         self.config = config
+        # Optional adaptive shedding on ledger latency, on top of the fixed load threshold
+        self.admission = admission
 
-    async def enforce_policy(self, agent_id: str, priority: PriorityLevel, estimated_cost: float):
+    async def enforce_policy(self, agent_id: str, priority: PriorityLevel, estimated_cost: float,
+                             op_type: Optional[OperationType] = None) -> bool:
         """
         Enforce resource policy before allowing an operation.
-        Raises ResourceExhaustionHalt if the operation is denied due to system state.
+        Raises ResourceExhaustionHalt if the operation is denied due to system state,
+        or if op_type is given and the agent's rolling budget for it is spent.
         Returns False if the agent is insolvent.
         Returns True if the operation is allowed.
         """
@@ -42,7 +54,7 @@ class ResourcePolicy:
             current_temp = max(cpu_temp, gpu_temp)
             
             if current_temp > self.config.thermal_limit_celsius:
-                raise ResourceExhaustionHalt(f"THERMAL GUARD TRIGGERED: System temp {current_temp}°C exceeds limit.")
+                raise ResourceExhaustionHalt(f"System temp {current_temp}°C exceeds limit.", reason="THERMAL GUARD TRIGGERED")
             
             # Load Shedding
             current_load = max(getattr(hw_state, 'cpu_load', 0.0), getattr(hw_state, 'gpu_load', 0.0)) / 100.0
@@ -50,14 +62,33 @@ class ResourcePolicy:
                 # If system is under heavy load, prioritize Live Game State
                 if priority < PriorityLevel.LIVE_GAME_STATE:
                      # Staking Mechanism: Lower priority tasks are shed first
-                     raise ResourceExhaustionHalt(f"LOAD SHEDDING: Priority {priority.name} insufficient for current load {current_load*100}%.")
+                     raise ResourceExhaustionHalt(f"Priority {priority.name} insufficient for current load {current_load*100}%.", reason="LOAD SHEDDING")
+
+        # Adaptive Shedding: back off before the ledger's write queue backs up
+        if self.admission is not None and not self.admission.admit(priority):
+            raise ResourceExhaustionHalt(
+                f"Priority {priority.name} admitted with probability "
+                f"{self.admission.probability(priority):.2f} under current ledger latency.",
+                reason="ADAPTIVE SHEDDING",
+            )
+
+        # 2. Check Rolling Budgets (in-memory, O(1))
+        if op_type is not None:
+            limit = self.manager.budgets.exceeded_limit(agent_id, op_type, estimated_cost)
+            if limit is not None:
+                spent = self.manager.budgets.spent(agent_id, op_type)
+                raise ResourceExhaustionHalt(
+                    f"Agent {agent_id} spent {spent} of {limit.limit_cc} CC "
+                    f"on {op_type.value} in the last {limit.window_seconds}s.",
+                    reason="QUOTA WINDOW EXHAUSTED",
+                )
 
-        # 2. Check Solvency (The Ledger)
+        # 3. Check Solvency (The Ledger)
         solvent = await self.manager.check_solvency(agent_id, required_cc=estimated_cost + self.config.min_solvency_buffer)
         if not solvent:
             # Strict enforcement: No credits, no compute.
              # "Halt Logic: If an agent's account reaches zero... issue RESOURCE_EXHAUSTION_HALT"
-            raise ResourceExhaustionHalt(f"INSOLVENCY: Agent {agent_id} lacks sufficient Compute Credits.")
+            raise ResourceExhaustionHalt(f"Agent {agent_id} lacks sufficient Compute Credits.", reason="INSOLVENCY")
 
         return True
 
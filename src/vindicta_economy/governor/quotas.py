@@ -1,6 +1,6 @@
 
 from enum import Enum
-from typing import Dict, Optional, Protocol
+from typing import Any, Dict, Mapping, Optional, Protocol
 
 # Define Operation Types
 class OperationType(str, Enum):
@@ -41,7 +41,8 @@ class ResourceQuotas:
     def calculate_cost(
         op_type: OperationType, 
         hardware_state: Optional[HardwareStateProtocol] = None,
-        **kwargs
+        cost_table: Optional[Mapping[OperationType, float]] = None,
+        **kwargs: Any
     ) -> float:
         """
         Calculate the cost of an operation based on its type and current hardware state.
@@ -49,12 +50,13 @@ class ResourceQuotas:
         Args:
             op_type: The type of operation.
             hardware_state: Current state of the hardware (optional).
+            cost_table: Base costs to price against (defaults to COST_TABLE).
             **kwargs: Additional parameters for specific operations (e.g., 'depth' for search).
             
         Returns:
             The calculated cost in Compute Credits (CC).
         """
-        base_cost = COST_TABLE.get(op_type, 1.0)
+        base_cost = (COST_TABLE if cost_table is None else cost_table).get(op_type, 1.0)
         
         # apply operation-specific modifiers
         if op_type == OperationType.ALPHA_BETA_SEARCH:
@@ -0,0 +1,285 @@
+
+import asyncio
+import heapq
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from vindicta_economy.ledger.atomic_credits import ENTRY_CREDIT, ENTRY_DEBIT, AtomicLedger
+from vindicta_economy.ledger.change_feed import LedgerEvent, LedgerEventType, OverflowPolicy, Subscription
+from vindicta_economy.ledger.currencies import DEFAULT_CURRENCY, CurrencyKey, currency_key
+
+AccountKey = Tuple[str, str]  # (agent_id, currency)
+_COPY_PAGES = 256  # Per step when copying an in-memory ledger; writers run in between
+SpendKey = Tuple[str, str, int]  # (currency, action_type, bucket index)
+
+@dataclass
+class LedgerEntry:
+    transaction_id: Optional[str]
+    agent_id: str
+    currency: str
+    action_type: Optional[str]
+    amount: float
+    entry_type: str  # ENTRY_DEBIT or ENTRY_CREDIT
+    timestamp: float
+
+class LedgerAnalytics:
+    """
+    Read-only dashboard queries served from a replica of the ledger.
+
+    refresh() copies the database into a private in-memory replica with
+    SQLite's backup API and rebuilds the materialized aggregates (balances
+    and spend per action_type per `bucket_seconds`) from it. Between
+    refreshes the aggregates are kept current from the ledger's change feed,
+    so queries never touch the live file.
+
+    refresh() never takes the ledger's write lock. It subscribes to the feed
+    first and then copies: a file is switched to WAL mode (which persists)
+    so the copy's read transaction never blocks writers, and an in-memory
+    database is copied a few pages at a time with writes let in between.
+    Events for writes the copy already caught are recognized by their
+    transaction id and skipped. The feed subscription drops rather than
+    blocks when analytics falls behind, so the spend path never waits on
+    it; a replica that missed events is rebuilt on the next refresh.
+
+    Only writes made through this ledger reach its feed. Writes by other
+    ledgers or processes on the same file (e.g. another event loop's
+    manager) show up at the next refresh, and `stale` does not flag them.
+    Balances of parent accounts drawn by pooled debits are likewise only
+    exact as of the last refresh.
+    """
+
+    def __init__(self, ledger: AtomicLedger, refresh_seconds: float = 60.0,
+                 bucket_seconds: float = 60.0, max_pending_events: int = 10_000):
+        self.ledger = ledger
+        self.refresh_seconds = refresh_seconds
+        self.bucket_seconds = bucket_seconds
+        self.max_pending_events = max_pending_events
+        self.refreshed_at: Optional[float] = None
+        self._replica: Optional[sqlite3.Connection] = None
+        self._replica_lock = threading.Lock()
+        self._balances: Dict[AccountKey, float] = {}
+        self._spend: Dict[SpendKey, float] = {}
+        self._recent: List[LedgerEvent] = []  # Applied since the last refresh, oldest first
+        self._subscription: Optional[Subscription] = None
+        self._consumer: Optional["asyncio.Task[None]"] = None
+        self._refresher: Optional["asyncio.Task[None]"] = None
+        self._refresh_lock = asyncio.Lock()
+
+    # --- Lifecycle ---
+
+    async def start(self) -> None:
+        """Build the replica now and refresh it every refresh_seconds."""
+        await self.refresh()
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_periodically())
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            await self.refresh()
+
+    async def aclose(self) -> None:
+        for task in (self._refresher, self._consumer):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._refresher = self._consumer = None
+        if self._subscription is not None:
+            self._subscription.close()
+            self._subscription = None
+        if self._replica is not None:
+            self._replica.close()
+            self._replica = None
+
+    @property
+    def stale(self) -> bool:
+        """True if the feed dropped events since the last refresh."""
+        return self._subscription is None or self._subscription.dropped > 0
+
+    # --- Refresh ---
+
+    async def refresh(self) -> None:
+        """Replace the replica and aggregates with a fresh copy of the ledger."""
+        async with self._refresh_lock:
+            replica = sqlite3.connect(":memory:", check_same_thread=False)
+            # Everything emitted before this point is committed, so in the copy;
+            # _consume skips the later events the copy caught as well.
+            subscription = self.ledger.feed.subscribe(
+                maxsize=self.max_pending_events, policy=OverflowPolicy.DROP_OLDEST
+            )
+            loop = asyncio.get_running_loop()
+            try:
+                copy = self._copy_memory_sync if self.ledger._memory_conn is not None else self._copy_file_sync
+                await loop.run_in_executor(None, copy, replica)
+                balances, spend = await loop.run_in_executor(None, self._aggregate_sync, replica)
+            except BaseException:
+                subscription.close()
+                replica.close()
+                raise
+
+            if self._consumer is not None:
+                self._consumer.cancel()
+            if self._subscription is not None:
+                self._subscription.close()
+            old = self._replica
+            with self._replica_lock:
+                self._replica = replica
+            if old is not None:
+                old.close()
+            self._balances, self._spend, self._recent = balances, spend, []
+            self._subscription = subscription
+            self._consumer = asyncio.create_task(self._consume(subscription))
+            self.refreshed_at = time.time()
+
+    def _copy_memory_sync(self, replica: sqlite3.Connection) -> None:
+        self.ledger._ensure_schema()
+        source = self.ledger._memory_conn
+        lock = self.ledger._memory_lock
+        assert source is not None
+
+        def between_steps(status: int, remaining: int, total: int) -> None:
+            # Writes in between are applied to the copy as well (same connection)
+            lock.release()
+            time.sleep(0)
+            lock.acquire()
+
+        with lock:
+            source.backup(replica, pages=_COPY_PAGES, progress=between_steps)
+
+    def _copy_file_sync(self, replica: sqlite3.Connection) -> None:
+        self.ledger._ensure_schema()
+        source = sqlite3.connect(self.ledger.db_path, timeout=30.0, check_same_thread=False)
+        try:
+            if source.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+                source.execute("PRAGMA journal_mode=WAL")
+            source.backup(replica)  # One step, so one consistent read snapshot
+        finally:
+            source.close()
+
+    def _aggregate_sync(self, replica: sqlite3.Connection
+                        ) -> Tuple[Dict[AccountKey, float], Dict[SpendKey, float]]:
+        balances = {
+            (agent_id, currency): balance
+            for agent_id, currency, balance in replica.execute(
+                "SELECT agent_id, currency, balance FROM accounts"
+            )
+        }
+        spend = {
+            (currency, action_type, bucket): total
+            for currency, action_type, bucket, total in replica.execute("""
+                SELECT currency, action_type, CAST(timestamp / ? AS INTEGER), SUM(amount)
+                FROM transactions
+                WHERE entry_type = ?
+                GROUP BY 1, 2, 3
+            """, (self.bucket_seconds, ENTRY_DEBIT))
+        }
+        return balances, spend
+
+    # --- Incremental Updates ---
+
+    async def _consume(self, subscription: Subscription) -> None:
+        catching_up = True
+        async for event in subscription:
+            if catching_up:
+                # Commits are published in order, so the copy holds a prefix of these
+                if self._in_replica(event):
+                    continue
+                catching_up = False
+            self._apply(event)
+
+    def _in_replica(self, event: LedgerEvent) -> bool:
+        """Primary-key lookup in the in-memory replica; cheap enough for the loop."""
+        if event.transaction_id is None:
+            return False
+        with self._replica_lock:
+            if self._replica is None:
+                return False
+            row = self._replica.execute(
+                "SELECT 1 FROM transactions WHERE id = ?", (event.transaction_id,)
+            ).fetchone()
+        return row is not None
+
+    def _apply(self, event: LedgerEvent) -> None:
+        if event.balance_after is not None:
+            self._balances[(event.agent_id, event.currency)] = event.balance_after
+        if event.counterparty_id is not None and event.counterparty_balance_after is not None:
+            self._balances[(event.counterparty_id, event.currency)] = event.counterparty_balance_after
+        if event.event_type in (LedgerEventType.DEBIT, LedgerEventType.TRANSFER):
+            key = (event.currency, event.action_type or "", int(event.timestamp // self.bucket_seconds))
+            self._spend[key] = self._spend.get(key, 0.0) + event.amount
+        self._recent.append(event)
+
+    # --- Queries ---
+
+    def top_balances(self, n: int = 10, currency: CurrencyKey = DEFAULT_CURRENCY) -> List[Tuple[str, float]]:
+        """The n largest (agent_id, balance) pairs in a currency, largest first."""
+        currency = currency_key(currency)
+        return heapq.nlargest(
+            n,
+            ((agent_id, balance) for (agent_id, cur), balance in self._balances.items() if cur == currency),
+            key=lambda item: item[1],
+        )
+
+    def spend_by_action(self, since: Optional[float] = None, until: Optional[float] = None,
+                        currency: CurrencyKey = DEFAULT_CURRENCY) -> Dict[str, float]:
+        """
+        Total debited per action_type in [since, until). Both bounds are
+        rounded down to a bucket_seconds boundary.
+        """
+        currency = currency_key(currency)
+        low = None if since is None else int(since // self.bucket_seconds)
+        high = None if until is None else int(until // self.bucket_seconds)
+        totals: Dict[str, float] = {}
+        for (cur, action_type, bucket), amount in self._spend.items():
+            if cur != currency or (low is not None and bucket < low) or (high is not None and bucket >= high):
+                continue
+            totals[action_type] = totals.get(action_type, 0.0) + amount
+        return totals
+
+    async def agent_history(self, agent_id: str, limit: int = 50) -> List[LedgerEntry]:
+        """An agent's most recent entries across all currencies, newest first."""
+        recent = [entry for event in reversed(self._recent) for entry in self._entries_for(event, agent_id)]
+        if len(recent) >= limit:
+            return recent[:limit]
+        loop = asyncio.get_running_loop()
+        older = await loop.run_in_executor(None, self._history_sync, agent_id, limit - len(recent))
+        return recent + older
+
+    @staticmethod
+    def _entries_for(event: LedgerEvent, agent_id: str) -> List[LedgerEntry]:
+        if event.agent_id == agent_id:
+            entry_type = ENTRY_CREDIT if event.event_type == LedgerEventType.CREDIT else ENTRY_DEBIT
+            return [LedgerEntry(event.transaction_id, agent_id, event.currency, event.action_type,
+                                event.amount, entry_type, event.timestamp)]
+        if event.event_type == LedgerEventType.TRANSFER and event.counterparty_id == agent_id:
+            transaction_id = f"{event.transaction_id}_cr" if event.transaction_id else None
+            return [LedgerEntry(transaction_id, agent_id, event.currency, event.action_type,
+                                event.amount, ENTRY_CREDIT, event.timestamp)]
+        return []
+
+    def _history_sync(self, agent_id: str, limit: int) -> List[LedgerEntry]:
+        with self._replica_lock:
+            if self._replica is None:
+                return []
+            rows = self._replica.execute("""
+                SELECT id, agent_id, currency, action_type, amount, entry_type, timestamp
+                FROM transactions
+                WHERE agent_id = ?
+                ORDER BY timestamp DESC
+                LIMIT ?
+            """, (agent_id, limit)).fetchall()
+        return [LedgerEntry(*row) for row in rows]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "refreshed_at": self.refreshed_at,
+            "events_since_refresh": len(self._recent),
+            "dropped": self._subscription.dropped if self._subscription is not None else 0,
+            "accounts": len(self._balances),
+        }
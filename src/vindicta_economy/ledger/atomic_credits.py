@@ -1,14 +1,45 @@
 
 import asyncio
 import json
+import os
+import queue
 import sqlite3
+import threading
 import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, TypeVar, Union
 
 from pydantic import BaseModel, Field, field_validator
 
+from vindicta_economy.ledger.change_feed import ChangeFeed, LedgerEventType
+from vindicta_economy.ledger.currencies import (
+    DEFAULT_CURRENCY,
+    CurrencyConversion,
+    CurrencyExchange,
+    CurrencyKey,
+    CurrencyRegistry,
+    currency_key,
+)
+
+if TYPE_CHECKING:
+    from vindicta_economy.models import Currency
+
+_T = TypeVar("_T")
+
+# Keeps IN (...) lists under SQLite's bound-parameter limit
+SQL_BATCH_SIZE = 500
+
+# Bumped whenever the schema below changes; stored in PRAGMA user_version
+SCHEMA_VERSION = 4
+
+# transactions.entry_type values; balance = sum(credits) - sum(debits)
+ENTRY_DEBIT = "debit"
+ENTRY_CREDIT = "credit"
+
 # --- Models ---
 
 class ComputeCreditTransaction(BaseModel):
@@ -16,106 +47,512 @@ class ComputeCreditTransaction(BaseModel):
     agent_id: str
     action_type: str
     amount: float = Field(..., gt=0, description="Cost in Compute Credits")
+    currency: str = DEFAULT_CURRENCY
     timestamp: float = Field(default_factory=time.time)
-    metadata: dict = Field(default_factory=dict)
+    metadata: Dict[str, Any] = Field(default_factory=dict)
 
 class AccountBalance(BaseModel):
     agent_id: str
+    currency: str = DEFAULT_CURRENCY
     balance: float = Field(default=0.0, ge=0.0)
     last_updated: float = Field(default_factory=time.time)
 
+class _SettlementLeg(NamedTuple):
+    agent_id: str
+    currency: str
+    delta: float  # Negative legs are debits, positive legs credits
+    action_type: str
+    transaction_id: str
+    metadata: Dict[str, Any]
+
+# --- Shared Writers ---
+
+class _SharedWriter:
+    """
+    One thread per database file that performs every pooled-ledger write.
+
+    Ledgers on different event loops (or threads) that point at the same
+    file submit here, so their writes are serialized in submission order
+    over a single connection instead of contending for SQLite's lock.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.refs = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ledger-writer")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._thread_id: Optional[int] = None
+
+    def submit(self, fn: Callable[..., _T], *args: Any) -> "Future[_T]":
+        return self._executor.submit(fn, *args)
+
+    def owns_current_thread(self) -> bool:
+        return threading.get_ident() == self._thread_id
+
+    def connection(self) -> sqlite3.Connection:
+        """The writer's connection; only valid on the writer thread."""
+        if self._conn is None:
+            self._thread_id = threading.get_ident()
+            self._conn = sqlite3.connect(self.db_path, timeout=30.0)
+            # WAL lets pooled readers proceed while the writer commits
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        return self._conn
+
+    def _close_sync(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def shutdown(self) -> None:
+        """Finish queued writes, close the connection and stop the thread."""
+        self._executor.submit(self._close_sync)
+        self._executor.shutdown(wait=True)
+
+_writers: Dict[str, _SharedWriter] = {}
+_writers_lock = threading.Lock()
+
+def _acquire_writer(db_path: str) -> _SharedWriter:
+    key = os.path.abspath(db_path)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = _SharedWriter(db_path)
+        writer.refs += 1
+        return writer
+
+def _release_writer(writer: _SharedWriter) -> None:
+    with _writers_lock:
+        writer.refs -= 1
+        if writer.refs > 0:
+            return
+        key = os.path.abspath(writer.db_path)
+        if _writers.get(key) is writer:
+            del _writers[key]
+    writer.shutdown()
+
+def _reset_writers_after_fork() -> None:
+    # Writer threads do not survive fork; the child starts with none
+    global _writers_lock
+    _writers.clear()
+    _writers_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_writers_after_fork)
+
 # --- Ledger Implementation ---
 
 class AtomicLedger:
-    def __init__(self, db_path: str = "compute_ledger.db"):
+    """
+    Double-entry credit ledger over SQLite.
+
+    With pool_size=0 (the default) every call opens its own connection. With
+    pool_size > 0 reads reuse up to that many pooled connections and writes
+    go through the process-wide writer thread for db_path, which ledgers on
+    other event loops share. Pooled ledgers should be closed with aclose().
+    """
+
+    def __init__(self, db_path: str = "compute_ledger.db", currencies: Iterable["Currency"] = (),
+                 pool_size: int = 0):
         self.db_path = db_path
         self._lock = asyncio.Lock()
-        self._init_db()
+        self.feed = ChangeFeed()
+        self.currencies = CurrencyRegistry(currencies)
+        # Schema setup is deferred to the first storage call so constructing a
+        # ledger (and VoidBankerManager) does no I/O.
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        # ":memory:" databases live in one shared connection (each new
+        # connection would otherwise see an empty database).
+        self._memory_conn: Optional[sqlite3.Connection] = None
+        self._memory_lock = threading.RLock()
+        # Account hierarchy, loaded on first use: child -> parent, and the
+        # resolved ancestor chain per agent (nearest first). Valid while the
+        # stored hierarchy_version matches; other ledgers on the same file bump
+        # it too. Guarded by a lock as reads run on executor threads.
+        self._parents: Optional[Dict[str, str]] = None
+        self._ancestor_cache: Dict[str, Tuple[str, ...]] = {}
+        self._hierarchy_version: Optional[int] = None
+        self._hierarchy_lock = threading.Lock()
+        self._closed = False
+        # Writes waiting on or holding _lock, and callbacks told how long each took
+        self.pending_writes = 0
+        self._latency_observers: List[Callable[[float, int], None]] = []
+        self.pool_size = pool_size
+        self._pool: "queue.SimpleQueue[sqlite3.Connection]" = queue.SimpleQueue()
+        self._writer: Optional[_SharedWriter] = None
+        if db_path == ":memory:":
+            self._memory_conn = sqlite3.connect(db_path, check_same_thread=False)
+        elif pool_size > 0:
+            self._writer = _acquire_writer(db_path)
 
-    def _init_db(self):
-        """Initialize the SQLite database schema."""
-        with sqlite3.connect(self.db_path) as conn:
+    async def _run_sync(self, fn: Callable[..., _T], *args: Any) -> _T:
+        """Run a blocking storage call off the event loop (inline for in-memory ledgers)."""
+        if self._memory_conn is not None:
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, fn, *args)
+
+    async def _run_write(self, fn: Callable[..., _T], *args: Any) -> _T:
+        """Like _run_sync, but on the shared writer thread when the ledger is pooled."""
+        if self._closed:
+            raise RuntimeError("Ledger is closed")
+        if self._writer is None:
+            return await self._run_sync(fn, *args)
+        return await asyncio.wrap_future(self._writer.submit(fn, *args))
+
+    def add_latency_observer(self, observer: Callable[[float, int], None]) -> None:
+        """
+        Call observer(latency_seconds, pending_writes) after every write, where
+        latency covers waiting for the write lock and the commit (but not
+        publishing to the change feed), and pending_writes counts the writes
+        still queued behind it.
+        """
+        if observer not in self._latency_observers:
+            self._latency_observers.append(observer)
+
+    def remove_latency_observer(self, observer: Callable[[float, int], None]) -> None:
+        if observer in self._latency_observers:
+            self._latency_observers.remove(observer)
+
+    async def _write(self, fn: Callable[..., _T], *args: Any,
+                     publish: Optional[Callable[[_T], None]] = None) -> _T:
+        """
+        Run fn on the write path under the write lock, then hand its result to
+        publish, which emits change-feed events without waiting on subscribers.
+        The write runs to completion even if the caller is cancelled meanwhile,
+        so every commit is published exactly once, in commit order.
+        """
+        self.pending_writes += 1
+        start = time.perf_counter()
+        try:
+            async with self._lock:
+                cancelled = False
+                try:
+                    if self._memory_conn is not None:
+                        result = await self._run_write(fn, *args)  # Inline; nothing to cancel
+                    else:
+                        write = asyncio.ensure_future(self._run_write(fn, *args))
+                        while not write.done():
+                            try:
+                                await asyncio.shield(write)
+                            except asyncio.CancelledError:
+                                cancelled = True
+                        result = write.result()
+                finally:
+                    # Lock wait plus commit; publishing is not storage latency
+                    latency = time.perf_counter() - start
+                    for observer in self._latency_observers:
+                        observer(latency, self.pending_writes - 1)
+                if publish is not None:
+                    publish(result)
+                if cancelled:
+                    raise asyncio.CancelledError()
+                return result
+        finally:
+            self.pending_writes -= 1
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Yield a connection that commits on success and rolls back on error."""
+        if self._memory_conn is not None:
+            with self._memory_lock, self._memory_conn as conn:
+                yield conn
+        elif self._writer is None:
+            with sqlite3.connect(self.db_path) as conn:
+                yield conn
+        elif self._writer.owns_current_thread():
+            with self._writer.connection() as conn:
+                yield conn
+        else:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                conn = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False)
+            try:
+                with conn:
+                    yield conn
+            finally:
+                if self._closed or self._pool.qsize() >= self.pool_size:
+                    conn.close()
+                else:
+                    self._pool.put(conn)
+
+    async def aclose(self) -> None:
+        """
+        Let in-flight and already queued writes finish, then end change-feed
+        subscriptions and release connections. Later writes raise RuntimeError.
+        """
+        if self._closed:
+            return
+        # The lock is FIFO, so every write waiting on it goes before us
+        async with self._lock:
+            self._closed = True
+        self.feed.close()
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        if self._writer is not None:
+            writer, self._writer = self._writer, None
+            await asyncio.get_running_loop().run_in_executor(None, _release_writer, writer)
+        if self._memory_conn is not None:
+            with self._memory_lock:
+                self._memory_conn.close()
+
+    def _ensure_schema(self) -> None:
+        """Create or migrate the schema once per instance; skipped when user_version matches."""
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            with self._connect() as conn:
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version == SCHEMA_VERSION:
+                self._schema_ready = True
+            else:
+                self._init_db()
+
+    def _init_db(self) -> None:
+        """
+        Initialize or upgrade the SQLite database schema.
+        The whole upgrade is one IMMEDIATE transaction, so processes opening the
+        same file at once take turns, and a crash part way leaves it untouched.
+        """
+        with self._connect() as conn:
             cursor = conn.cursor()
-            # Accounts table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS accounts (
-                    agent_id TEXT PRIMARY KEY,
-                    balance REAL NOT NULL CHECK(balance >= 0),
-                    last_updated REAL
-                )
-            ''')
-            # Transactions table
+            # DDL does not open a transaction implicitly, so begin one explicitly
+            cursor.execute("BEGIN IMMEDIATE")
+            # Another process may have finished the upgrade while we waited
+            if cursor.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                self._upgrade_schema(cursor)
+            conn.commit()
+        with self._hierarchy_lock:
+            self._hierarchy_version = None
+        self._schema_ready = True
+
+    def _upgrade_schema(self, cursor: sqlite3.Cursor) -> None:
+        """Bring any earlier layout up to SCHEMA_VERSION, inside the caller's transaction."""
+        cursor.execute("PRAGMA table_info(accounts)")
+        columns = {row[1] for row in cursor.fetchall()}
+        if columns and "currency" not in columns:
+            self._migrate_single_currency(cursor)
+        # Accounts table: one row per (agent, currency)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS accounts (
+                agent_id TEXT NOT NULL,
+                currency TEXT NOT NULL DEFAULT 'vindicta_credits',
+                balance REAL NOT NULL CHECK(balance >= 0),
+                last_updated REAL,
+                PRIMARY KEY (agent_id, currency)
+            )
+        ''')
+        # Transactions table: every balance change, debit or credit
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS transactions (
+                id TEXT PRIMARY KEY,
+                agent_id TEXT NOT NULL,
+                currency TEXT NOT NULL DEFAULT 'vindicta_credits',
+                action_type TEXT NOT NULL,
+                amount REAL NOT NULL,
+                timestamp REAL,
+                metadata TEXT,
+                entry_type TEXT NOT NULL DEFAULT 'debit'
+            )
+        ''')
+        cursor.execute("PRAGMA table_info(transactions)")
+        if "entry_type" not in {row[1] for row in cursor.fetchall()}:
+            # Before v2 only debits were recorded
+            cursor.execute("ALTER TABLE transactions ADD COLUMN entry_type TEXT NOT NULL DEFAULT 'debit'")
+            self._backfill_opening_balances(cursor)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_transactions_agent
+            ON transactions (agent_id, currency, timestamp)
+        ''')
+        # Parent/child accounts; spend_cap bounds what a child (and its
+        # descendants) may draw from its ancestors in total.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS account_hierarchy (
+                agent_id TEXT PRIMARY KEY,
+                parent_id TEXT NOT NULL,
+                spend_cap REAL,
+                pooled_spent REAL NOT NULL DEFAULT 0
+            )
+        ''')
+        # Counters shared by every ledger on this file (e.g. hierarchy_version)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ledger_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO ledger_meta (key, value) VALUES ('hierarchy_version', 0)")
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @staticmethod
+    def _backfill_opening_balances(cursor: sqlite3.Cursor) -> None:
+        """
+        Give every pre-v2 account one opening_balance credit covering the grants
+        that were never recorded (balance + debits so far), dated no later than
+        its first debit, so balances reconcile against the transactions table.
+        """
+        cursor.execute("""
+            INSERT INTO transactions (id, agent_id, currency, action_type, amount, timestamp, metadata, entry_type)
+            SELECT 'opening_' || a.agent_id || '_' || a.currency, a.agent_id, a.currency, 'opening_balance',
+                   a.balance + COALESCE(SUM(t.amount), 0),
+                   COALESCE(MIN(t.timestamp), a.last_updated, 0), '{}', ?
+            FROM accounts a
+            LEFT JOIN transactions t ON t.agent_id = a.agent_id AND t.currency = a.currency
+            GROUP BY a.agent_id, a.currency
+            HAVING a.balance + COALESCE(SUM(t.amount), 0) > 0
+        """, (ENTRY_CREDIT,))
+
+    @staticmethod
+    def _migrate_single_currency(cursor: sqlite3.Cursor) -> None:
+        """Rebuild pre-currency tables, assigning existing rows to the default currency."""
+        cursor.execute("ALTER TABLE accounts RENAME TO accounts_v0")
+        cursor.execute('''
+            CREATE TABLE accounts (
+                agent_id TEXT NOT NULL,
+                currency TEXT NOT NULL DEFAULT 'vindicta_credits',
+                balance REAL NOT NULL CHECK(balance >= 0),
+                last_updated REAL,
+                PRIMARY KEY (agent_id, currency)
+            )
+        ''')
+        cursor.execute(
+            "INSERT INTO accounts (agent_id, currency, balance, last_updated) "
+            "SELECT agent_id, ?, balance, last_updated FROM accounts_v0",
+            (DEFAULT_CURRENCY,),
+        )
+        cursor.execute("DROP TABLE accounts_v0")
+        cursor.execute("PRAGMA table_info(transactions)")
+        if cursor.fetchall():
+            # The old table carried a foreign key to accounts(agent_id), which is
+            # no longer unique, so it is rebuilt rather than altered.
+            cursor.execute("ALTER TABLE transactions RENAME TO transactions_v0")
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS transactions (
+                CREATE TABLE transactions (
                     id TEXT PRIMARY KEY,
                     agent_id TEXT NOT NULL,
+                    currency TEXT NOT NULL DEFAULT 'vindicta_credits',
                     action_type TEXT NOT NULL,
                     amount REAL NOT NULL,
                     timestamp REAL,
-                    metadata TEXT,
-                    FOREIGN KEY(agent_id) REFERENCES accounts(agent_id)
+                    metadata TEXT
                 )
             ''')
-            conn.commit()
+            cursor.execute(
+                "INSERT INTO transactions (id, agent_id, currency, action_type, amount, timestamp, metadata) "
+                "SELECT id, agent_id, ?, action_type, amount, timestamp, metadata FROM transactions_v0",
+                (DEFAULT_CURRENCY,),
+            )
+            cursor.execute("DROP TABLE transactions_v0")
 
-    async def get_balance(self, agent_id: str) -> float:
+    def register_currency(self, currency: "Currency") -> None:
+        """Honor a currency's decimal precision for all future operations."""
+        self.currencies.register(currency)
+
+    async def get_balance(self, agent_id: str, currency: CurrencyKey = DEFAULT_CURRENCY) -> float:
         """Get the current balance for an agent."""
         # SQLite queries are blocking, so we run them in a thread if needed, 
         # but for simple implementations, we can just use the lock.
         # However, asyncio.Lock only protects against concurrent async tasks, 
         # not blocking IO. We should use run_in_executor for SQLite calls 
         # if we want true non-blocking behavior.
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self._get_balance_sync, agent_id)
+        return await self._run_sync(self._get_balance_sync, agent_id, currency_key(currency))
 
-    def _get_balance_sync(self, agent_id: str) -> float:
-        with sqlite3.connect(self.db_path) as conn:
+    def _get_balance_sync(self, agent_id: str, currency: str = DEFAULT_CURRENCY) -> float:
+        self._ensure_schema()
+        with self._connect() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT balance FROM accounts WHERE agent_id = ?", (agent_id,))
+            cursor.execute(
+                "SELECT balance FROM accounts WHERE agent_id = ? AND currency = ?", (agent_id, currency)
+            )
             row = cursor.fetchone()
             return row[0] if row else 0.0
 
+    async def get_balances(self, agent_id: str) -> Dict[str, float]:
+        """Get every currency balance held by an agent."""
+        return await self._run_sync(self._get_balances_sync, agent_id)
+
+    def _get_balances_sync(self, agent_id: str) -> Dict[str, float]:
+        self._ensure_schema()
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT currency, balance FROM accounts WHERE agent_id = ?", (agent_id,))
+            return dict(cursor.fetchall())
+
     async def record_transaction(self, transaction: ComputeCreditTransaction) -> bool:
         """
         Record a transaction and update the balance.
         Returns True if successful, False if insufficient funds.
         """
-        async with self._lock:
-            loop = asyncio.get_running_loop()
-            return await loop.run_in_executor(None, self._record_transaction_sync, transaction)
+        currency = currency_key(transaction.currency)
+        amount = self.currencies.quantize(transaction.amount, currency)
+        if amount <= 0:
+            return False
+        transaction = transaction.model_copy(update={"currency": currency, "amount": amount})
 
-    def _record_transaction_sync(self, transaction: ComputeCreditTransaction) -> bool:
-        with sqlite3.connect(self.db_path) as conn:
+        def publish(new_balance: Optional[float]) -> None:
+            if new_balance is not None:
+                self.feed.emit(
+                    LedgerEventType.DEBIT,
+                    transaction.agent_id,
+                    transaction.amount,
+                    currency=currency,
+                    transaction_id=transaction.id,
+                    action_type=transaction.action_type,
+                    balance_after=new_balance,
+                    timestamp=transaction.timestamp,
+                    metadata=transaction.metadata,
+                )
+
+        new_balance = await self._write(self._record_transaction_sync, transaction, publish=publish)
+        return new_balance is not None
+
+    def _record_transaction_sync(self, transaction: ComputeCreditTransaction) -> Optional[float]:
+        """Returns the new balance, or None if the debit was refused."""
+        self._ensure_schema()
+        with self._connect() as conn:
+            ancestors = self._ancestors(conn, transaction.agent_id)
+            if ancestors:
+                return self._record_pooled_sync(conn, transaction, ancestors)
             cursor = conn.cursor()
             try:
                 # check balance
-                cursor.execute("SELECT balance FROM accounts WHERE agent_id = ?", (transaction.agent_id,))
+                cursor.execute(
+                    "SELECT balance FROM accounts WHERE agent_id = ? AND currency = ?",
+                    (transaction.agent_id, transaction.currency),
+                )
                 row = cursor.fetchone()
                 current_balance = row[0] if row else 0.0
 
                 if current_balance < transaction.amount:
-                    return False  # Insufficient funds
+                    return None  # Insufficient funds
 
                 # Update balance
-                new_balance = current_balance - transaction.amount
+                new_balance = self.currencies.quantize(current_balance - transaction.amount, transaction.currency)
                 cursor.execute("""
                     UPDATE accounts SET balance = ?, last_updated = ? 
-                    WHERE agent_id = ?
-                """, (new_balance, time.time(), transaction.agent_id))
+                    WHERE agent_id = ? AND currency = ?
+                """, (new_balance, time.time(), transaction.agent_id, transaction.currency))
                 
                 if cursor.rowcount == 0:
                      # Account might need creation if we allow overdraft or seed logic, 
                      # but here we require existing funds or seed.
                      # Let's assume accounts must be funded first. This function handles strictly spending.
-                     return False
+                     return None
 
                 # Log transaction
                 cursor.execute("""
-                    INSERT INTO transactions (id, agent_id, action_type, amount, timestamp, metadata)
-                    VALUES (?, ?, ?, ?, ?, ?)
+                    INSERT INTO transactions (id, agent_id, currency, action_type, amount, timestamp, metadata)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
                 """, (
                     transaction.id, 
                     transaction.agent_id, 
+                    transaction.currency,
                     transaction.action_type, 
                     transaction.amount, 
                     transaction.timestamp, 
@@ -123,28 +560,473 @@ class AtomicLedger:
                 ))
                 
                 conn.commit()
-                return True
+                return new_balance
             except sqlite3.IntegrityError:
                 conn.rollback()
-                return False
+                return None
             except Exception as e:
                 conn.rollback()
                 raise e
 
-    async def credit_account(self, agent_id: str, amount: float):
+    # --- Account Hierarchy ---
+
+    def _ancestors(self, conn: sqlite3.Connection, agent_id: str) -> Tuple[str, ...]:
+        """
+        Ancestor chain, nearest first. Cached; each call costs one primary-key
+        lookup of hierarchy_version, and the map is reloaded when it moved.
+        """
+        version = conn.execute("SELECT value FROM ledger_meta WHERE key = 'hierarchy_version'").fetchone()[0]
+        with self._hierarchy_lock:
+            if self._parents is None or version != self._hierarchy_version:
+                self._parents = dict(conn.execute("SELECT agent_id, parent_id FROM account_hierarchy").fetchall())
+                self._ancestor_cache = {}
+                self._hierarchy_version = version
+            cached = self._ancestor_cache.get(agent_id)
+            if cached is not None:
+                return cached
+            chain: List[str] = []
+            node = self._parents.get(agent_id)
+            while node is not None:
+                chain.append(node)
+                node = self._parents.get(node)
+            self._ancestor_cache[agent_id] = result = tuple(chain)
+            return result
+
+    @staticmethod
+    def _bump_hierarchy_version(conn: sqlite3.Connection) -> None:
+        conn.execute("UPDATE ledger_meta SET value = value + 1 WHERE key = 'hierarchy_version'")
+
+    async def set_parent(self, agent_id: str, parent_id: str, spend_cap: Optional[float] = None) -> None:
+        """
+        Attach an account to a parent whose balance it may draw on once its own
+        runs out. spend_cap limits the total drawn from ancestors (None for no
+        cap); re-attaching resets the amount drawn so far.
+        Raises ValueError if this would create a cycle.
+        """
+        await self._write(self._set_parent_sync, agent_id, parent_id, spend_cap)
+
+    def _set_parent_sync(self, agent_id: str, parent_id: str, spend_cap: Optional[float]) -> None:
+        self._ensure_schema()
+        with self._connect() as conn:
+            if parent_id == agent_id or agent_id in self._ancestors(conn, parent_id):
+                raise ValueError(f"Making {parent_id} the parent of {agent_id} would create a cycle.")
+            conn.execute("""
+                INSERT INTO account_hierarchy (agent_id, parent_id, spend_cap, pooled_spent)
+                VALUES (?, ?, ?, 0)
+                ON CONFLICT(agent_id) DO UPDATE SET
+                parent_id = excluded.parent_id,
+                spend_cap = excluded.spend_cap,
+                pooled_spent = 0
+            """, (agent_id, parent_id, spend_cap))
+            self._bump_hierarchy_version(conn)
+            conn.commit()
+
+    async def remove_parent(self, agent_id: str) -> None:
+        """Detach an account from its parent; it then spends only its own balance."""
+        await self._write(self._remove_parent_sync, agent_id)
+
+    def _remove_parent_sync(self, agent_id: str) -> None:
+        self._ensure_schema()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM account_hierarchy WHERE agent_id = ?", (agent_id,))
+            self._bump_hierarchy_version(conn)
+            conn.commit()
+
+    async def get_available_balance(self, agent_id: str, currency: CurrencyKey = DEFAULT_CURRENCY) -> float:
+        """What the agent can spend: its own balance plus what its ancestors and caps allow."""
+        return await self._run_sync(self._get_available_balance_sync, agent_id, currency_key(currency))
+
+    def _get_available_balance_sync(self, agent_id: str, currency: str = DEFAULT_CURRENCY) -> float:
+        self._ensure_schema()
+        with self._connect() as conn:
+            ancestors = self._ancestors(conn, agent_id)
+            if not ancestors:
+                row = conn.execute(
+                    "SELECT balance FROM accounts WHERE agent_id = ? AND currency = ?", (agent_id, currency)
+                ).fetchone()
+                return row[0] if row else 0.0
+            draws = self._plan_draws(conn.cursor(), (agent_id, *ancestors), currency, float("inf"))
+        return sum(draws.values())
+
+    def _plan_draws(self, cursor: sqlite3.Cursor, chain: Tuple[str, ...], currency: str,
+                    amount: float) -> Dict[str, float]:
+        """
+        Split a debit across the chain (the agent, then its ancestors nearest
+        first). A draw from level i counts against the cap of every node below
+        it, so the usable headroom is carried upward in O(depth).
+        """
+        marks = ','.join('?' * len(chain))
+        cursor.execute(
+            f"SELECT agent_id, balance FROM accounts WHERE currency = ? AND agent_id IN ({marks})",
+            (currency, *chain),
+        )
+        balances = dict(cursor.fetchall())
+        cursor.execute(
+            f"SELECT agent_id, spend_cap, pooled_spent FROM account_hierarchy WHERE agent_id IN ({marks})",
+            chain,
+        )
+        caps = {agent: (cap, spent) for agent, cap, spent in cursor.fetchall()}
+
+        draws: Dict[str, float] = {}
+        remaining = amount
+        headroom = float("inf")
+        for level, node in enumerate(chain):
+            if level > 0:
+                cap, spent = caps.get(chain[level - 1], (None, 0.0))
+                if cap is not None:
+                    headroom = min(headroom, cap - spent)
+            limit = remaining if level == 0 else min(remaining, headroom)
+            take = min(balances.get(node, 0.0), limit)
+            if take > 0:
+                draws[node] = take
+                remaining -= take
+                if level > 0:
+                    headroom -= take
+            if remaining <= 0:
+                break
+        return draws
+
+    def _record_pooled_sync(self, conn: sqlite3.Connection, transaction: ComputeCreditTransaction,
+                            ancestors: Tuple[str, ...]) -> Optional[float]:
+        """Debit the agent first, then its ancestors, in one storage transaction."""
+        chain = (transaction.agent_id, *ancestors)
+        cursor = conn.cursor()
+        try:
+            draws = self._plan_draws(cursor, chain, transaction.currency, transaction.amount)
+            if sum(draws.values()) < transaction.amount:
+                return None  # Insufficient funds across the chain
+            now = time.time()
+            cursor.executemany("""
+                UPDATE accounts SET balance = balance - ?, last_updated = ?
+                WHERE agent_id = ? AND currency = ?
+            """, [(take, now, node, transaction.currency) for node, take in draws.items()])
+            # Each node's pooled spend grows by everything drawn above it
+            pooled: Dict[str, float] = {}
+            drawn_above = 0.0
+            for node in reversed(chain):
+                pooled[node] = drawn_above
+                drawn_above += draws.get(node, 0.0)
+            cursor.executemany(
+                "UPDATE account_hierarchy SET pooled_spent = pooled_spent + ? WHERE agent_id = ?",
+                [(spent, node) for node, spent in pooled.items() if spent > 0],
+            )
+            transaction.metadata = {**transaction.metadata, "drawn_from": draws}
+            # The requesting agent always carries the entry under transaction.id
+            # (possibly for 0 if its own balance was empty); ancestors get one
+            # entry per draw.
+            entries = {transaction.agent_id: draws.get(transaction.agent_id, 0.0)}
+            entries.update((node, take) for node, take in draws.items() if node != transaction.agent_id)
+            cursor.executemany("""
+                INSERT INTO transactions (id, agent_id, currency, action_type, amount, timestamp, metadata)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (transaction.id if node == transaction.agent_id else f"{transaction.id}_{node}", node,
+                 transaction.currency, transaction.action_type, take, transaction.timestamp,
+                 json.dumps({**transaction.metadata, "drawn_by": transaction.agent_id}))
+                for node, take in entries.items()
+            ])
+            cursor.execute(
+                "SELECT balance FROM accounts WHERE agent_id = ? AND currency = ?",
+                (transaction.agent_id, transaction.currency),
+            )
+            row = cursor.fetchone()
+            conn.commit()
+            return row[0] if row else 0.0
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            return None
+        except Exception as e:
+            conn.rollback()
+            raise e
+
+    async def credit_account(self, agent_id: str, amount: float, currency: CurrencyKey = DEFAULT_CURRENCY) -> None:
         """Inject credits into an account (e.g. initial grant or reward)."""
-        async with self._lock:
-            loop = asyncio.get_running_loop()
-            await loop.run_in_executor(None, self._credit_account_sync, agent_id, amount)
+        currency = currency_key(currency)
+        amount = self.currencies.quantize(amount, currency)
+        transaction_id = f"credit_{uuid.uuid4().hex}"
+
+        def publish(new_balance: float) -> None:
+            self.feed.emit(
+                LedgerEventType.CREDIT, agent_id, amount, currency=currency,
+                transaction_id=transaction_id, balance_after=new_balance,
+            )
 
-    def _credit_account_sync(self, agent_id: str, amount: float):
-         with sqlite3.connect(self.db_path) as conn:
+        await self._write(self._credit_account_sync, agent_id, amount, currency, transaction_id, publish=publish)
+
+    def _credit_account_sync(self, agent_id: str, amount: float, currency: str = DEFAULT_CURRENCY,
+                             transaction_id: Optional[str] = None) -> float:
+         self._ensure_schema()
+         with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                INSERT INTO accounts (agent_id, balance, last_updated)
-                VALUES (?, ?, ?)
-                ON CONFLICT(agent_id) DO UPDATE SET
+                INSERT INTO accounts (agent_id, currency, balance, last_updated)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(agent_id, currency) DO UPDATE SET
                 balance = balance + ?,
                 last_updated = ?
-            """, (agent_id, amount, time.time(), amount, time.time()))
+            """, (agent_id, currency, amount, time.time(), amount, time.time()))
+            cursor.execute("""
+                INSERT INTO transactions (id, agent_id, currency, action_type, amount, timestamp, metadata, entry_type)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (transaction_id or f"credit_{uuid.uuid4().hex}", agent_id, currency, "credit", amount,
+                  time.time(), "{}", ENTRY_CREDIT))
+            cursor.execute(
+                "SELECT balance FROM accounts WHERE agent_id = ? AND currency = ?", (agent_id, currency)
+            )
+            new_balance: float = cursor.fetchone()[0]
             conn.commit()
+            return new_balance
+
+    async def credit_accounts(self, grants: Iterable[Tuple[str, float]],
+                              action_type: Optional[str] = None,
+                              currency: CurrencyKey = DEFAULT_CURRENCY,
+                              extra_writes: Optional[Callable[[sqlite3.Connection], None]] = None
+                              ) -> Dict[str, float]:
+        """
+        Credit many accounts in a single storage transaction.
+        Grants to the same agent are summed. Returns the new balance per agent.
+        extra_writes, if given, runs on the same connection before the commit,
+        so its rows and the credits are stored together or not at all.
+        """
+        currency = currency_key(currency)
+        totals: Dict[str, float] = {}
+        for agent_id, amount in grants:
+            totals[agent_id] = totals.get(agent_id, 0.0) + amount
+        totals = {a: self.currencies.quantize(t, currency) for a, t in totals.items()}
+        if not totals:
+            return {}
+
+        transaction_ids = {agent_id: f"credit_{uuid.uuid4().hex}" for agent_id in totals}
+
+        def publish(balances: Dict[str, float]) -> None:
+            for agent_id, amount in totals.items():
+                self.feed.emit(
+                    LedgerEventType.CREDIT, agent_id, amount, currency=currency,
+                    transaction_id=transaction_ids[agent_id], action_type=action_type,
+                    balance_after=balances[agent_id]
+                )
+
+        balances: Dict[str, float] = await self._write(
+            self._credit_accounts_sync, totals, currency, action_type or "credit", transaction_ids,
+            extra_writes, publish=publish,
+        )
+        return balances
+
+    def _credit_accounts_sync(self, totals: Dict[str, float], currency: str = DEFAULT_CURRENCY,
+                              action_type: str = "credit",
+                              transaction_ids: Optional[Dict[str, str]] = None,
+                              extra_writes: Optional[Callable[[sqlite3.Connection], None]] = None
+                              ) -> Dict[str, float]:
+        self._ensure_schema()
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            now = time.time()
+            cursor.executemany("""
+                INSERT INTO accounts (agent_id, currency, balance, last_updated)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(agent_id, currency) DO UPDATE SET
+                balance = balance + excluded.balance,
+                last_updated = excluded.last_updated
+            """, [(agent_id, currency, amount, now) for agent_id, amount in totals.items()])
+            cursor.executemany("""
+                INSERT INTO transactions (id, agent_id, currency, action_type, amount, timestamp, metadata, entry_type)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, [
+                ((transaction_ids or {}).get(agent_id) or f"credit_{uuid.uuid4().hex}",
+                 agent_id, currency, action_type, amount, now, "{}", ENTRY_CREDIT)
+                for agent_id, amount in totals.items()
+            ])
+            balances: Dict[str, float] = {}
+            agent_ids = list(totals)
+            for i in range(0, len(agent_ids), SQL_BATCH_SIZE):
+                chunk = agent_ids[i:i + SQL_BATCH_SIZE]
+                cursor.execute(f"""
+                    SELECT agent_id, balance FROM accounts
+                    WHERE currency = ? AND agent_id IN ({','.join('?' * len(chunk))})
+                """, [currency, *chunk])
+                balances.update(cursor.fetchall())
+            if extra_writes is not None:
+                extra_writes(conn)
+            conn.commit()
+            return balances
+
+    async def transfer(self, from_agent_id: str, to_agent_id: str, amount: float,
+                       transaction_id: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None,
+                       currency: CurrencyKey = DEFAULT_CURRENCY) -> bool:
+        """
+        Move credits between two accounts in a single storage transaction.
+        Returns True if successful, False if the sender has insufficient funds.
+        """
+        currency = currency_key(currency)
+        amount = self.currencies.quantize(amount, currency)
+        if amount <= 0:
+            return False
+        transaction_id = transaction_id or f"xfer_{uuid.uuid4().hex}"
+        metadata = {**(metadata or {}), "to_agent_id": to_agent_id}
+        legs = [
+            _SettlementLeg(from_agent_id, currency, -amount, "transfer", transaction_id, metadata),
+            _SettlementLeg(to_agent_id, currency, amount, "transfer", transaction_id, metadata),
+        ]
+
+        def publish(balances: Optional[Dict[Tuple[str, str], float]]) -> None:
+            if balances is not None:
+                self.feed.emit(
+                    LedgerEventType.TRANSFER,
+                    from_agent_id,
+                    amount,
+                    currency=currency,
+                    transaction_id=transaction_id,
+                    action_type="transfer",
+                    counterparty_id=to_agent_id,
+                    balance_after=balances[(from_agent_id, currency)],
+                    counterparty_balance_after=balances[(to_agent_id, currency)],
+                    metadata=metadata,
+                )
+
+        return await self._write(self._settle_sync, legs, publish=publish) is not None
+
+    async def convert_currencies(self, conversions: Sequence[CurrencyConversion]) -> bool:
+        """
+        Convert balances between currencies for a batch of agents.
+        All conversions settle in one storage transaction; if any agent lacks
+        funds, none are applied and False is returned. Raises ValueError,
+        before anything is written, if a conversion would credit nothing
+        after rounding down to the target currency's precision.
+        """
+        legs: List[_SettlementLeg] = []
+        for conversion in conversions:
+            source = currency_key(conversion.from_currency)
+            target = currency_key(conversion.to_currency)
+            debit = self.currencies.quantize(conversion.amount, source)
+            credit = self.currencies.quantize_down(debit * conversion.rate, target)
+            if credit <= 0:
+                raise ValueError(
+                    f"Converting {debit} {source} to {target} at rate {conversion.rate} credits nothing."
+                )
+            transaction_id = f"conv_{uuid.uuid4().hex}"
+            metadata = {"to_currency": target, "rate": conversion.rate, "credited": credit}
+            legs.append(_SettlementLeg(conversion.agent_id, source, -debit,
+                                       "currency_conversion", transaction_id, metadata))
+            legs.append(_SettlementLeg(conversion.agent_id, target, credit,
+                                       "currency_conversion", transaction_id, metadata))
+        return await self._settle(legs)
+
+    async def exchange(self, exchanges: Sequence[CurrencyExchange]) -> bool:
+        """
+        Settle a batch of two-party swaps in one storage transaction.
+        Each side gives its amount to the other; all or nothing.
+        """
+        legs: List[_SettlementLeg] = []
+        for ex in exchanges:
+            give = currency_key(ex.give_currency)
+            receive = currency_key(ex.receive_currency)
+            give_amount = self.currencies.quantize(ex.give_amount, give)
+            receive_amount = self.currencies.quantize(ex.receive_amount, receive)
+            transaction_id = f"exch_{uuid.uuid4().hex}"
+            legs += [
+                _SettlementLeg(ex.agent_id, give, -give_amount, "currency_exchange",
+                               f"{transaction_id}_a", {"counterparty_id": ex.counterparty_id}),
+                _SettlementLeg(ex.counterparty_id, give, give_amount, "currency_exchange",
+                               f"{transaction_id}_a", {"counterparty_id": ex.agent_id}),
+                _SettlementLeg(ex.counterparty_id, receive, -receive_amount, "currency_exchange",
+                               f"{transaction_id}_b", {"counterparty_id": ex.agent_id}),
+                _SettlementLeg(ex.agent_id, receive, receive_amount, "currency_exchange",
+                               f"{transaction_id}_b", {"counterparty_id": ex.counterparty_id}),
+            ]
+        return await self._settle(legs)
+
+    async def _settle(self, legs: List[_SettlementLeg]) -> bool:
+        if not legs:
+            return True
+
+        def publish(balances: Optional[Dict[Tuple[str, str], float]]) -> None:
+            if balances is None:
+                return
+            for leg in legs:
+                if leg.delta == 0:
+                    continue  # Not stored either
+                self.feed.emit(
+                    LedgerEventType.DEBIT if leg.delta < 0 else LedgerEventType.CREDIT,
+                    leg.agent_id,
+                    abs(leg.delta),
+                    currency=leg.currency,
+                    # The id the leg's row is stored under
+                    transaction_id=leg.transaction_id if leg.delta < 0 else f"{leg.transaction_id}_cr",
+                    action_type=leg.action_type,
+                    balance_after=balances[(leg.agent_id, leg.currency)],
+                    metadata=leg.metadata,
+                )
+
+        return await self._write(self._settle_sync, legs, publish=publish) is not None
+
+    def _settle_sync(self, legs: List[_SettlementLeg]) -> Optional[Dict[Tuple[str, str], float]]:
+        """
+        Apply every leg in one storage transaction.
+        Returns the resulting balance per (agent_id, currency), or None if any
+        account cannot cover its debits. Debits are checked before netting, so
+        an account cannot pay with what the same batch credits it (e.g. a
+        transfer to itself).
+        """
+        net: Dict[Tuple[str, str], float] = {}
+        debits: Dict[Tuple[str, str], float] = {}
+        for leg in legs:
+            key = (leg.agent_id, leg.currency)
+            net[key] = net.get(key, 0.0) + leg.delta
+            if leg.delta < 0:
+                debits[key] = debits.get(key, 0.0) - leg.delta
+        self._ensure_schema()
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            try:
+                for (agent_id, currency), debit in debits.items():
+                    cursor.execute(
+                        "SELECT balance FROM accounts WHERE agent_id = ? AND currency = ?",
+                        (agent_id, currency),
+                    )
+                    row = cursor.fetchone()
+                    if row is None or row[0] < debit:
+                        conn.rollback()
+                        return None
+                now = time.time()
+                for (agent_id, currency), delta in net.items():
+                    if delta >= 0:
+                        cursor.execute("""
+                            INSERT INTO accounts (agent_id, currency, balance, last_updated)
+                            VALUES (?, ?, ?, ?)
+                            ON CONFLICT(agent_id, currency) DO UPDATE SET
+                            balance = balance + excluded.balance,
+                            last_updated = excluded.last_updated
+                        """, (agent_id, currency, delta, now))
+                    else:
+                        # CHECK(balance >= 0) rejects overdrafts
+                        cursor.execute("""
+                            UPDATE accounts SET balance = balance + ?, last_updated = ?
+                            WHERE agent_id = ? AND currency = ?
+                        """, (delta, now, agent_id, currency))
+                        if cursor.rowcount == 0:
+                            conn.rollback()
+                            return None
+                cursor.executemany("""
+                    INSERT INTO transactions (id, agent_id, currency, action_type, amount, timestamp, metadata, entry_type)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, [
+                    (leg.transaction_id if leg.delta < 0 else f"{leg.transaction_id}_cr",
+                     leg.agent_id, leg.currency, leg.action_type, abs(leg.delta), now,
+                     json.dumps(leg.metadata), ENTRY_DEBIT if leg.delta < 0 else ENTRY_CREDIT)
+                    for leg in legs if leg.delta != 0
+                ])
+                balances: Dict[Tuple[str, str], float] = {}
+                for agent_id, currency in net:
+                    cursor.execute(
+                        "SELECT balance FROM accounts WHERE agent_id = ? AND currency = ?",
+                        (agent_id, currency),
+                    )
+                    balances[(agent_id, currency)] = cursor.fetchone()[0]
+                conn.commit()
+                return balances
+            except sqlite3.IntegrityError:
+                conn.rollback()
+                return None
+            except Exception as e:
+                conn.rollback()
+                raise e
@@ -0,0 +1,158 @@
+
+import asyncio
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from vindicta_economy.ledger.atomic_credits import ENTRY_CREDIT, AtomicLedger
+
+AccountKey = Tuple[str, str]  # (agent_id, currency)
+
+@dataclass
+class Discrepancy:
+    agent_id: str
+    currency: str
+    recorded_balance: float  # accounts.balance (0.0 if the account row is missing)
+    expected_balance: float  # sum(credits) - sum(debits) from transactions
+
+    @property
+    def difference(self) -> float:
+        return self.recorded_balance - self.expected_balance
+
+@dataclass
+class AuditReport:
+    accounts_checked: int = 0
+    chunks: int = 0
+    discrepancies: List[Discrepancy] = field(default_factory=list)
+    checkpoint: Optional[AccountKey] = None  # Last account key fully audited
+    complete: bool = False  # True once the sweep reached the end of the table
+
+class LedgerAuditor:
+    """
+    Reconciles accounts.balance against the transactions table.
+
+    Accounts are walked in (agent_id, currency) order, `chunk_size` at a
+    time. Each chunk is one short read transaction joining that key range's
+    accounts with its aggregated transactions, so memory stays constant and
+    the writer is never locked out for long. `pause_seconds` between chunks
+    throttles the sweep further. Progress is checkpointed in the database
+    under `name`, so an interrupted sweep resumes where it stopped.
+
+    Accounts from before credit entries were recorded (schema v1) reconcile
+    through the opening_balance credit the v2 migration gives each of them.
+    """
+
+    def __init__(self, ledger: AtomicLedger, name: str = "default", chunk_size: int = 500,
+                 pause_seconds: float = 0.0, tolerance: float = 1e-6):
+        self.ledger = ledger
+        self.name = name
+        self.chunk_size = chunk_size
+        self.pause_seconds = pause_seconds
+        self.tolerance = tolerance
+
+    async def run(self, max_chunks: Optional[int] = None, resume: bool = True) -> AuditReport:
+        """
+        Audit from the saved checkpoint (or from the start if resume is False)
+        until the table ends or max_chunks chunks have been checked.
+        """
+        report = AuditReport()
+        await self.ledger._run_write(self._create_table_sync)
+        start = await self.ledger._run_sync(self._load_checkpoint_sync) if resume else None
+        report.checkpoint = start
+        while max_chunks is None or report.chunks < max_chunks:
+            if report.chunks and self.pause_seconds:
+                await asyncio.sleep(self.pause_seconds)
+            checked, last_key, discrepancies, done = await self.ledger._run_sync(
+                self._audit_chunk_sync, report.checkpoint
+            )
+            report.chunks += 1
+            report.accounts_checked += checked
+            report.discrepancies.extend(discrepancies)
+            report.checkpoint = last_key
+            if done:
+                report.complete = True
+                report.checkpoint = None
+                break
+        await self.ledger._run_write(self._save_checkpoint_sync, report.checkpoint)
+        return report
+
+    def _audit_chunk_sync(self, after: Optional[AccountKey]
+                          ) -> Tuple[int, Optional[AccountKey], List[Discrepancy], bool]:
+        self.ledger._ensure_schema()
+        lower = after or ("", "")
+        with self.ledger._connect() as conn:
+            cursor = conn.cursor()
+            # One read transaction per chunk so balances and entries agree
+            cursor.execute("BEGIN")
+            cursor.execute("""
+                SELECT agent_id, currency, balance FROM accounts
+                WHERE (agent_id, currency) > (?, ?)
+                ORDER BY agent_id, currency
+                LIMIT ?
+            """, (*lower, self.chunk_size))
+            recorded: Dict[AccountKey, float] = {(a, c): b for a, c, b in cursor.fetchall()}
+            done = len(recorded) < self.chunk_size
+
+            params: Tuple[str, ...]
+            if done:
+                # Last chunk: also catch entries for agents past the final account
+                range_sql, params = "(agent_id, currency) > (?, ?)", lower
+            else:
+                # A full chunk, so recorded is non-empty
+                upper = max(recorded)
+                range_sql, params = "(agent_id, currency) > (?, ?) AND (agent_id, currency) <= (?, ?)", (*lower, *upper)
+            cursor.execute(f"""
+                SELECT agent_id, currency,
+                       SUM(CASE WHEN entry_type = ? THEN amount ELSE -amount END)
+                FROM transactions
+                WHERE {range_sql}
+                GROUP BY agent_id, currency
+            """, (ENTRY_CREDIT, *params))
+            expected: Dict[AccountKey, float] = {(a, c): total for a, c, total in cursor.fetchall()}
+            conn.commit()
+
+        discrepancies = []
+        for key in sorted(recorded.keys() | expected.keys()):
+            balance = recorded.get(key, 0.0)
+            total = expected.get(key, 0.0)
+            if abs(balance - total) > self.tolerance:
+                discrepancies.append(Discrepancy(key[0], key[1], balance, total))
+        last_key = max(recorded.keys() | expected.keys(), default=after)
+        return len(recorded), last_key, discrepancies, done
+
+    def _create_table_sync(self) -> None:
+        self.ledger._ensure_schema()
+        with self.ledger._connect() as conn:
+            self._create_table(conn)
+
+    def _create_table(self, conn: sqlite3.Connection) -> None:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS audit_checkpoints (
+                name TEXT PRIMARY KEY,
+                agent_id TEXT,
+                currency TEXT,
+                updated REAL
+            )
+        ''')
+
+    def _load_checkpoint_sync(self) -> Optional[AccountKey]:
+        with self.ledger._connect() as conn:
+            row = conn.execute(
+                "SELECT agent_id, currency FROM audit_checkpoints WHERE name = ?", (self.name,)
+            ).fetchone()
+            return (row[0], row[1]) if row and row[0] is not None else None
+
+    def _save_checkpoint_sync(self, checkpoint: Optional[AccountKey]) -> None:
+        agent_id, currency = checkpoint or (None, None)
+        with self.ledger._connect() as conn:
+            self._create_table(conn)
+            conn.execute("""
+                INSERT INTO audit_checkpoints (name, agent_id, currency, updated)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                agent_id = excluded.agent_id,
+                currency = excluded.currency,
+                updated = excluded.updated
+            """, (self.name, agent_id, currency, time.time()))
+            conn.commit()
@@ -0,0 +1,248 @@
+
+import asyncio
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Deque, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from vindicta_economy.ledger.currencies import DEFAULT_CURRENCY
+
+# --- Models ---
+
+class LedgerEventType(str, Enum):
+    DEBIT = "debit"
+    CREDIT = "credit"
+    TRANSFER = "transfer"
+
+class LedgerEvent(BaseModel):
+    """A committed ledger mutation, as seen by change-feed subscribers."""
+    sequence: int
+    event_type: LedgerEventType
+    agent_id: str
+    amount: float
+    currency: str = DEFAULT_CURRENCY
+    transaction_id: Optional[str] = None  # Id of the stored row (the debit row for a transfer)
+    action_type: Optional[str] = None
+    counterparty_id: Optional[str] = None  # Recipient of a transfer
+    balance_after: Optional[float] = None
+    counterparty_balance_after: Optional[float] = None
+    timestamp: float = Field(default_factory=time.time)
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+
+class OverflowPolicy(str, Enum):
+    BLOCK = "block"              # Backpressure: delivery waits for room (up to block_timeout)
+    DROP_OLDEST = "drop_oldest"  # Evict the oldest queued event
+    DROP_NEWEST = "drop_newest"  # Discard the incoming event
+
+class SequenceGapError(Exception):
+    """Raised when a subscriber resumes from a sequence not retained (or not yet issued)."""
+    pass
+
+# --- Feed Implementation ---
+
+class Subscription:
+    """
+    A single consumer's view of the change feed.
+    Iterate with `async for event in subscription`.
+
+    DROP_* subscriptions receive each event as it is emitted. A BLOCK
+    subscription has its own delivery task that waits for room in the queue,
+    so its backpressure never reaches other subscribers; events waiting on it
+    are bounded by maxsize too, and the newest is dropped beyond that.
+    """
+
+    def __init__(self, feed: "ChangeFeed", maxsize: int, policy: OverflowPolicy,
+                 backlog: List[LedgerEvent], start_sequence: int,
+                 block_timeout: Optional[float] = None):
+        self._feed = feed
+        self._queue: "asyncio.Queue[Optional[LedgerEvent]]" = asyncio.Queue(maxsize=maxsize)
+        self._backlog: Deque[LedgerEvent] = deque(backlog)
+        self._waiting: Deque[LedgerEvent] = deque()  # BLOCK only: emitted, waiting for room
+        self._delivery: Optional["asyncio.Task[None]"] = None
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self.closed = False
+        self.last_sequence = start_sequence
+        # Highest sequence queued, waiting or dropped; anything up to the feed's
+        # position at subscribe time is either in the backlog or not wanted.
+        self._delivered = feed.last_sequence
+
+    def _offer(self, event: LedgerEvent) -> None:
+        """Producer side: take an event without ever waiting."""
+        if self.closed or event.sequence <= self._delivered:
+            return
+        if self.policy != OverflowPolicy.BLOCK or (not self._waiting and not self._queue.full()):
+            self._deliver_nowait(event)
+            return
+        self._delivered = event.sequence
+        if len(self._waiting) >= self._queue.maxsize:
+            self.dropped += 1
+            return
+        self._waiting.append(event)
+        loop = asyncio.get_running_loop()
+        if self._delivery is None or self._delivery.done() or self._delivery.get_loop() is not loop:
+            self._delivery = loop.create_task(self._deliver_waiting())
+
+    async def _deliver_waiting(self) -> None:
+        while self._waiting:
+            event = self._waiting[0]
+            try:
+                await asyncio.wait_for(self._queue.put(event), self.block_timeout)
+            except asyncio.TimeoutError:
+                self.dropped += 1  # A stalled consumer must not pile up events forever
+            self._waiting.popleft()
+
+    def _deliver_nowait(self, event: LedgerEvent) -> None:
+        self._delivered = max(self._delivered, event.sequence)
+        if self._queue.full():
+            self.dropped += 1
+            if self.policy != OverflowPolicy.DROP_OLDEST:
+                return
+            self._queue.get_nowait()
+        self._queue.put_nowait(event)
+
+    def _stop_delivery(self) -> None:
+        if self._delivery is not None:
+            self._delivery.cancel()
+            self._delivery = None
+
+    def _end(self) -> None:
+        """Producer side: no more events; the consumer may drain what is queued."""
+        self._stop_delivery()
+        # Hand over whatever was still waiting for room, without waiting
+        while self._waiting:
+            self._deliver_nowait(self._waiting.popleft())
+        self.closed = True
+        try:
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass  # __anext__ stops once the queue runs dry
+
+    def close(self) -> None:
+        """Consumer side: unsubscribe and discard anything still queued."""
+        self._feed._unsubscribe(self)
+        self._stop_delivery()
+        self.closed = True
+        self._backlog.clear()
+        self._waiting.clear()
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> LedgerEvent:
+        if self._backlog:
+            event = self._backlog.popleft()
+        else:
+            if self.closed and self._queue.empty():
+                raise StopAsyncIteration
+            queued = await self._queue.get()
+            if queued is None:
+                raise StopAsyncIteration
+            event = queued
+        self.last_sequence = event.sequence
+        return event
+
+class ChangeFeed:
+    """
+    In-process publish/subscribe stream of committed ledger mutations.
+
+    Every event gets a monotonically increasing sequence number. The most
+    recent `retention` events are kept so subscribers can resume after a
+    disconnect. Sequences are per-process and restart at 1.
+
+    emit() numbers an event and hands it to every subscriber without
+    waiting; each subscriber's queue is bounded by its own overflow policy.
+    The ledger emits while it still holds its write lock, so sequence order
+    is commit order, but it never waits on a subscriber.
+    """
+
+    def __init__(self, retention: int = 10_000):
+        self._history: Deque[LedgerEvent] = deque(maxlen=retention)
+        self._subscribers: List[Subscription] = []
+        self._sequence = 0
+
+    @property
+    def last_sequence(self) -> int:
+        return self._sequence
+
+    def subscribe(self, maxsize: int = 1000,
+                  policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+                  from_sequence: Optional[int] = None,
+                  block_timeout: Optional[float] = 5.0) -> Subscription:
+        """
+        Register a subscriber.
+        If from_sequence is given, every retained event after it is replayed first.
+        Raises SequenceGapError if events after from_sequence have been evicted,
+        or if from_sequence is ahead of the feed (e.g. saved before a restart).
+        With the BLOCK policy an event that finds no room within block_timeout
+        seconds is dropped (None waits indefinitely), as is one arriving while
+        maxsize events are already waiting.
+        """
+        if from_sequence is not None and from_sequence > self._sequence:
+            raise SequenceGapError(
+                f"Sequence {from_sequence} is ahead of the feed (last is {self._sequence}); "
+                f"sequences restart at 1 in each process."
+            )
+        backlog: List[LedgerEvent] = []
+        if from_sequence is not None and from_sequence < self._sequence:
+            oldest = self._history[0].sequence if self._history else self._sequence + 1
+            if from_sequence + 1 < oldest:
+                raise SequenceGapError(
+                    f"Sequence {from_sequence + 1} is no longer retained (oldest is {oldest})."
+                )
+            backlog = [e for e in self._history if e.sequence > from_sequence]
+        start = self._sequence if from_sequence is None else from_sequence
+        sub = Subscription(self, maxsize, policy, backlog, start, block_timeout)
+        self._subscribers.append(sub)
+        return sub
+
+    def _unsubscribe(self, sub: Subscription) -> None:
+        if sub in self._subscribers:
+            self._subscribers.remove(sub)
+
+    def emit(self, event_type: LedgerEventType, agent_id: str, amount: float,
+             **fields: Any) -> LedgerEvent:
+        """Assign the next sequence number and hand the event to every subscriber."""
+        self._sequence += 1
+        event = LedgerEvent(sequence=self._sequence, event_type=event_type,
+                            agent_id=agent_id, amount=amount, **fields)
+        self._history.append(event)
+        for sub in list(self._subscribers):
+            sub._offer(event)
+        return event
+
+    async def publish(self, event_type: LedgerEventType, agent_id: str, amount: float,
+                      **fields: Any) -> LedgerEvent:
+        """emit(), then wait until the event has been handed to every subscriber."""
+        event = self.emit(event_type, agent_id, amount, **fields)
+        await self.drain()
+        return event
+
+    async def drain(self) -> None:
+        """Wait until every emitted event has been queued for (or dropped by) each subscriber."""
+        while True:
+            pending = {
+                sub._delivery for sub in self._subscribers
+                if sub._delivery is not None and not sub._delivery.done()
+            }
+            if not pending:
+                return
+            await asyncio.wait(pending)
+
+    def close(self) -> None:
+        """End every subscription; queued events remain readable."""
+        for sub in self._subscribers:
+            sub._end()
+        self._subscribers.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "last_sequence": self._sequence,
+            "subscribers": len(self._subscribers),
+            "retained": len(self._history),
+        }
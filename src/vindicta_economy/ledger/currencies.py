@@ -0,0 +1,65 @@
+
+import math
+from typing import TYPE_CHECKING, Dict, Iterable, Union
+
+from pydantic import BaseModel, Field
+
+if TYPE_CHECKING:
+    from vindicta_economy.models import Currency, CurrencyType
+
+# Matches CurrencyType.VINDICTA_CREDITS; kept as a plain string so the ledger
+# does not import the platform models at runtime.
+DEFAULT_CURRENCY = "vindicta_credits"
+
+CurrencyKey = Union[str, "CurrencyType"]
+
+def currency_key(currency: CurrencyKey) -> str:
+    """Normalize a CurrencyType or raw string to the stored currency code."""
+    return getattr(currency, "value", currency)
+
+class CurrencyRegistry:
+    """
+    Decimal precision per currency, taken from registered Currency definitions.
+    Unregistered currencies are stored at full float precision.
+    """
+
+    def __init__(self, currencies: Iterable["Currency"] = ()):
+        self._decimals: Dict[str, int] = {}
+        for currency in currencies:
+            self.register(currency)
+
+    def register(self, currency: "Currency") -> None:
+        self._decimals[currency_key(currency.type)] = currency.decimals
+
+    def quantize(self, amount: float, currency: CurrencyKey) -> float:
+        """Round an amount to the currency's precision."""
+        decimals = self._decimals.get(currency_key(currency))
+        return amount if decimals is None else round(amount, decimals)
+
+    def quantize_down(self, amount: float, currency: CurrencyKey) -> float:
+        """Truncate toward zero, so conversions never mint fractional value."""
+        decimals = self._decimals.get(currency_key(currency))
+        if decimals is None:
+            return amount
+        factor: int = 10 ** decimals
+        # Nudge before flooring so 0.29 * 100 == 28.999... still yields 0.29
+        return math.floor(round(amount * factor, 9)) / factor
+
+# --- Settlement Models ---
+
+class CurrencyConversion(BaseModel):
+    """Convert part of one agent's balance from one currency into another."""
+    agent_id: str
+    from_currency: str
+    to_currency: str
+    amount: float = Field(..., gt=0, description="Amount debited in from_currency")
+    rate: float = Field(..., gt=0, description="Units of to_currency per from_currency")
+
+class CurrencyExchange(BaseModel):
+    """Two agents swap balances, possibly in different currencies."""
+    agent_id: str
+    counterparty_id: str
+    give_currency: str
+    give_amount: float = Field(..., gt=0)
+    receive_currency: str
+    receive_amount: float = Field(..., gt=0)
@@ -1,29 +1,91 @@
 
 import asyncio
-from typing import Optional, Any
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Any
 from abc import ABC, abstractmethod
 
 from vindicta_economy.ledger.atomic_credits import AtomicLedger, ComputeCreditTransaction, AccountBalance
 from vindicta_economy.governor.quotas import ResourceQuotas, OperationType, HardwareStateProtocol, MockHardwareState
+from vindicta_economy.governor.budgets import QuotaBudgets
 
 class VoidBankerManager:
-    _instance = None
-    _lock = asyncio.Lock()
+    _instance: Optional["VoidBankerManager"] = None
+    # A thread lock, not an asyncio one: it is never held across an await and
+    # is not bound to whichever event loop happened to touch it first.
+    _lock = threading.Lock()
 
-    def __init__(self, db_path: str = "compute_ledger.db"):
-        self.ledger = AtomicLedger(db_path=db_path)
+    def __init__(self, db_path: str = "compute_ledger.db", pool_size: int = 0):
+        self.ledger = AtomicLedger(db_path=db_path, pool_size=pool_size)
         self.quotas = ResourceQuotas()
-        self.hardware_state: HardwareStateProtocol = MockHardwareState()
+        self.budgets = QuotaBudgets(ledger=self.ledger)
+        self.hardware_state: Optional[HardwareStateProtocol] = MockHardwareState()
+        self._persist_task: Optional["asyncio.Task[None]"] = None
+        # Purchases still running; they record budgets after their ledger write
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
 
     @classmethod
-    async def get_instance(cls, db_path: str = "compute_ledger.db"):
-        async with cls._lock:
+    async def get_instance(cls, db_path: str = "compute_ledger.db") -> "VoidBankerManager":
+        """Process-wide manager for legacy callers; prefer open() for new code."""
+        with cls._lock:
             if cls._instance is None:
                 cls._instance = cls(db_path)
             return cls._instance
 
-    def update_hardware_state(self, state: HardwareStateProtocol):
-        """Update the internal hardware state for pricing calculations."""
+    @classmethod
+    def _reset_after_fork(cls) -> None:
+        # The parent's manager holds connections and threads the child cannot use
+        cls._instance = None
+        cls._lock = threading.Lock()
+
+    @classmethod
+    @asynccontextmanager
+    async def open(cls, db_path: str = "compute_ledger.db", pool_size: int = 4) -> AsyncIterator["VoidBankerManager"]:
+        """
+        A manager owned by the current event loop.
+
+        Reads use a pool of up to pool_size connections; writes go through the
+        writer thread shared by every manager on db_path in this process, so
+        one manager per loop (or worker thread) is safe. Budget windows are
+        loaded on entry and persisted in the background. On exit pending
+        writes are drained, budgets persisted and connections closed.
+        """
+        manager = cls(db_path, pool_size=pool_size)
+        await manager.start()
+        try:
+            yield manager
+        finally:
+            await manager.aclose()
+
+    async def start(self) -> None:
+        """Restore persisted budget windows and start the background persister."""
+        await self.budgets.load()
+        if self._persist_task is None:
+            self._persist_task = asyncio.create_task(self._persist_budgets_periodically())
+
+    async def _persist_budgets_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.budgets.persist_interval)
+            await self.budgets.persist()
+
+    async def aclose(self) -> None:
+        """Stop background work, drain pending writes and release the ledger."""
+        if self._persist_task is not None:
+            self._persist_task.cancel()
+            try:
+                await self._persist_task
+            except asyncio.CancelledError:
+                pass
+            self._persist_task = None
+        await self._idle.wait()
+        await self.budgets.persist()
+        await self.ledger.aclose()
+
+    def update_hardware_state(self, state: Optional[HardwareStateProtocol]) -> None:
+        """Update the internal hardware state for pricing calculations. None prices at base cost."""
         self.hardware_state = state
 
     async def check_solvency(self, agent_id: str, required_cc: float) -> bool:
@@ -31,7 +93,8 @@ class VoidBankerManager:
         Check if an agent has enough credits for the operation.
         This is a pre-check and does not deduct credits.
         """
-        balance = await self.ledger.get_balance(agent_id)
+        # Includes whatever the agent may draw from parent accounts
+        balance = await self.ledger.get_available_balance(agent_id)
         return balance >= required_cc
 
     async def purchase_operation(self, agent_id: str, op_type: OperationType, depth: int = 1) -> bool:
@@ -40,6 +103,16 @@ class VoidBankerManager:
         Calculates cost, checks solvency, and deducts credits if sufficient.
         Returns True if successful, False otherwise.
         """
+        self._in_flight += 1
+        self._idle.clear()
+        try:
+            return await self._purchase(agent_id, op_type, depth)
+        finally:
+            self._in_flight -= 1
+            if not self._in_flight:
+                self._idle.set()
+
+    async def _purchase(self, agent_id: str, op_type: OperationType, depth: int) -> bool:
         cost = self.quotas.calculate_cost(op_type, hardware_state=self.hardware_state, depth=depth)
         
         # Transaction structure
@@ -52,9 +125,15 @@ class VoidBankerManager:
         )
 
         success = await self.ledger.record_transaction(txn)
+        if success:
+            self.budgets.record(agent_id, op_type, cost)
+            if self.budgets.persist_due():
+                await self.budgets.persist()
         return success
 
-    async def grant_credits(self, agent_id: str, amount: float):
+    async def grant_credits(self, agent_id: str, amount: float) -> None:
         """Admin function to grant credits."""
         await self.ledger.credit_account(agent_id, amount)
 
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=VoidBankerManager._reset_after_fork)
@@ -0,0 +1,250 @@
+
+import asyncio
+import json
+import os
+import sqlite3
+import zlib
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from vindicta_economy.governor.budgets import BudgetLimit, QuotaBudgets
+from vindicta_economy.governor.policy import (
+    PolicyConfig,
+    PriorityLevel,
+    ResourceExhaustionHalt,
+    ResourcePolicy,
+)
+from vindicta_economy.governor.quotas import COST_TABLE, OperationType, ResourceQuotas
+from vindicta_economy.ledger.atomic_credits import (
+    ENTRY_CREDIT,
+    ENTRY_DEBIT,
+    SQL_BATCH_SIZE,
+    ComputeCreditTransaction,
+)
+from vindicta_economy.ledger.currencies import DEFAULT_CURRENCY
+from vindicta_economy.ledger.manager import VoidBankerManager
+
+# --- Inputs ---
+
+@dataclass
+class HardwareSample:
+    """A point in a recorded hardware-state trace (satisfies HardwareStateProtocol)."""
+    timestamp: float
+    cpu_load: float = 0.0
+    gpu_load: float = 0.0
+    cpu_temp: float = 45.0
+    gpu_temp: float = 40.0
+    thermal_status: str = "nominal"
+
+@dataclass
+class ReplayScenario:
+    """The alternate configuration to price historical traffic under."""
+    cost_table: Dict[OperationType, float] = field(default_factory=lambda: dict(COST_TABLE))
+    policy: PolicyConfig = field(default_factory=PolicyConfig)
+    budgets: Dict[OperationType, BudgetLimit] = field(default_factory=dict)
+    # Used when a transaction's metadata does not record a priority
+    default_priority: PriorityLevel = PriorityLevel.STANDARD_OPERATION
+
+# --- Output ---
+
+@dataclass
+class ReplayReport:
+    transactions: int = 0
+    skipped: int = 0  # Entries that are not operations (credits, transfers, ...), applied as recorded
+    unapplied: int = 0  # Non-operation debits the simulated balance could no longer cover
+    baseline_revenue: float = 0.0
+    simulated_revenue: float = 0.0
+    denials: Dict[str, int] = field(default_factory=dict)  # Halt reason -> count
+    insolvent_agents: Set[str] = field(default_factory=set)
+
+    @property
+    def revenue_delta(self) -> float:
+        return self.simulated_revenue - self.baseline_revenue
+
+    @property
+    def total_denials(self) -> int:
+        return sum(self.denials.values())
+
+    def merge(self, other: "ReplayReport") -> None:
+        self.transactions += other.transactions
+        self.skipped += other.skipped
+        self.unapplied += other.unapplied
+        self.baseline_revenue += other.baseline_revenue
+        self.simulated_revenue += other.simulated_revenue
+        for reason, count in other.denials.items():
+            self.denials[reason] = self.denials.get(reason, 0) + count
+        self.insolvent_agents |= other.insolvent_agents
+
+# --- Replay Engine ---
+
+def replay(db_path: str, scenario: ReplayScenario,
+           hardware_trace: Sequence[HardwareSample] = (),
+           since: Optional[float] = None, until: Optional[float] = None,
+           opening_balances: Optional[Dict[str, float]] = None,
+           workers: Optional[int] = None) -> ReplayReport:
+    """
+    Replay recorded transactions from a ledger database under `scenario`.
+
+    Agents are independent, so traffic is partitioned by agent and each
+    partition runs in its own process against a private in-memory ledger.
+    The source database is only read. Without explicit opening_balances an
+    agent starts with what it held when the window opened: its current
+    balance with every recorded change since `since` unwound.
+
+    Every entry in the window is then replayed in time order: operation
+    debits are re-priced under the scenario, while credits, transfers and
+    conversions are applied as recorded. Parent/child pooling is not
+    modelled; a pooled operation is priced in full against the child, and
+    the draws recorded against its ancestors are skipped.
+
+    workers=1 runs in the calling process.
+    """
+    workers = workers or os.cpu_count() or 1
+    trace = sorted(hardware_trace, key=lambda s: s.timestamp)
+    if opening_balances is None:
+        opening_balances = _opening_balances(db_path, since, until)
+    agent_ids = sorted(opening_balances)
+
+    partitions: List[List[str]] = [[] for _ in range(workers)]
+    for agent_id in agent_ids:
+        partitions[zlib.crc32(agent_id.encode()) % workers].append(agent_id)
+    jobs = [
+        (db_path, part, {a: opening_balances[a] for a in part}, scenario, trace, since, until)
+        for part in partitions if part
+    ]
+
+    report = ReplayReport()
+    if not jobs:
+        return report
+    if workers == 1:
+        for job in jobs:
+            report.merge(_replay_partition(*job))
+        return report
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for partial in pool.map(_replay_partition, *zip(*jobs)):
+            report.merge(partial)
+    return report
+
+def _window_clause(since: Optional[float], until: Optional[float]) -> Tuple[str, List[float]]:
+    clauses, params = [], []
+    if since is not None:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("timestamp < ?")
+        params.append(until)
+    return "".join(f" AND {c}" for c in clauses), params
+
+def _opening_balances(db_path: str, since: Optional[float], until: Optional[float]) -> Dict[str, float]:
+    # Unwind every balance change since the window opened (including any after
+    # `until`); agents with no spend in the window are dropped.
+    where, params = _window_clause(since, None)
+    active_where, active_params = _window_clause(since, until)
+    with sqlite3.connect(f"file:{db_path}?mode=ro", uri=True) as conn:
+        active = {row[0] for row in conn.execute(f"""
+            SELECT DISTINCT agent_id FROM transactions
+            WHERE currency = ? AND entry_type = ?{active_where}
+        """, [DEFAULT_CURRENCY, ENTRY_DEBIT, *active_params])}
+        balances: Dict[str, float] = dict(conn.execute(
+            "SELECT agent_id, balance FROM accounts WHERE currency = ?", (DEFAULT_CURRENCY,)
+        ).fetchall())
+        changes = conn.execute(f"""
+            SELECT agent_id, SUM(CASE WHEN entry_type = ? THEN amount ELSE -amount END)
+            FROM transactions
+            WHERE currency = ?{where}
+            GROUP BY agent_id
+        """, [ENTRY_CREDIT, DEFAULT_CURRENCY, *params])
+        for agent_id, net in changes:
+            balances[agent_id] = balances.get(agent_id, 0.0) - net
+    return {agent_id: balances.get(agent_id, 0.0) for agent_id in active}
+
+def _stream_transactions(db_path: str, agent_ids: List[str], since: Optional[float],
+                         until: Optional[float]) -> Iterator[Tuple[str, str, float, float, str, str]]:
+    """
+    Yield (agent_id, action_type, amount, timestamp, metadata, entry_type) per
+    agent in time order (insertion order within a timestamp).
+    """
+    where, params = _window_clause(since, until)
+    with sqlite3.connect(f"file:{db_path}?mode=ro", uri=True) as conn:
+        for i in range(0, len(agent_ids), SQL_BATCH_SIZE):
+            chunk = agent_ids[i:i + SQL_BATCH_SIZE]
+            yield from conn.execute(f"""
+                SELECT agent_id, action_type, amount, timestamp, metadata, entry_type FROM transactions
+                WHERE currency = ?
+                AND agent_id IN ({','.join('?' * len(chunk))}){where}
+                ORDER BY agent_id, timestamp, rowid
+            """, [DEFAULT_CURRENCY, *chunk, *params])
+
+def _replay_partition(db_path: str, agent_ids: List[str], opening_balances: Dict[str, float],
+                      scenario: ReplayScenario, trace: List[HardwareSample],
+                      since: Optional[float], until: Optional[float]) -> ReplayReport:
+    return asyncio.run(_replay_agents(db_path, agent_ids, opening_balances, scenario, trace, since, until))
+
+async def _replay_agents(db_path: str, agent_ids: List[str], opening_balances: Dict[str, float],
+                         scenario: ReplayScenario, trace: List[HardwareSample],
+                         since: Optional[float], until: Optional[float]) -> ReplayReport:
+    report = ReplayReport()
+    now = [0.0]  # Replay clock, advanced to each transaction's timestamp
+    manager = VoidBankerManager(db_path=":memory:")
+    manager.budgets = QuotaBudgets(limits=scenario.budgets, clock=lambda: now[0])
+    policy = ResourcePolicy(manager=manager, config=scenario.policy)
+    trace_times = [s.timestamp for s in trace]
+    await manager.ledger.credit_accounts(opening_balances.items())
+
+    for seq, (agent_id, action_type, amount, timestamp, metadata, entry_type) in enumerate(
+            _stream_transactions(db_path, agent_ids, since, until)):
+        now[0] = timestamp or 0.0
+        meta = json.loads(metadata) if metadata else {}
+        if meta.get("drawn_by", agent_id) != agent_id:
+            continue  # An ancestor's share of a pooled operation, priced with the child's entry
+        try:
+            op_type = OperationType(action_type) if entry_type == ENTRY_DEBIT else None
+        except ValueError:
+            op_type = None
+        if op_type is None:
+            # Not an operation: move the balance exactly as recorded
+            report.skipped += 1
+            if amount <= 0:
+                continue
+            if entry_type == ENTRY_CREDIT:
+                await manager.ledger.credit_account(agent_id, amount)
+            elif not await manager.ledger.record_transaction(ComputeCreditTransaction(
+                    id=f"replay_{seq}", agent_id=agent_id, action_type=action_type,
+                    amount=amount, timestamp=now[0])):
+                report.unapplied += 1
+            continue
+        if "drawn_from" in meta:
+            amount = sum(meta["drawn_from"].values())  # The whole pooled operation
+        report.transactions += 1
+        report.baseline_revenue += amount
+
+        idx = bisect_right(trace_times, now[0]) - 1
+        hardware_state = trace[idx] if idx >= 0 else None
+        manager.update_hardware_state(hardware_state)
+        priority = PriorityLevel[meta["priority"]] if "priority" in meta else scenario.default_priority
+        cost = ResourceQuotas.calculate_cost(
+            op_type, hardware_state=hardware_state, cost_table=scenario.cost_table,
+            depth=meta.get("depth", 1),
+        )
+
+        try:
+            await policy.enforce_policy(agent_id, priority, cost, op_type=op_type)
+        except ResourceExhaustionHalt as halt:
+            report.denials[halt.reason] = report.denials.get(halt.reason, 0) + 1
+            if halt.reason == "INSOLVENCY":
+                report.insolvent_agents.add(agent_id)
+            continue
+        if cost <= 0:
+            continue  # Free under this scenario
+        recorded = await manager.ledger.record_transaction(ComputeCreditTransaction(
+            id=f"replay_{seq}", agent_id=agent_id, action_type=action_type,
+            amount=cost, timestamp=now[0],
+        ))
+        if recorded:
+            report.simulated_revenue += cost
+            manager.budgets.record(agent_id, op_type, cost)
+        else:
+            report.denials["INSUFFICIENT FUNDS"] = report.denials.get("INSUFFICIENT FUNDS", 0) + 1
+    return report
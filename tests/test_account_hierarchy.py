@@ -0,0 +1,83 @@
+
+import asyncio
+import pytest
+from vindicta_economy.ledger.atomic_credits import AtomicLedger, ComputeCreditTransaction
+from vindicta_economy.ledger.auditor import LedgerAuditor
+from vindicta_economy.ledger.manager import VoidBankerManager
+
+def _txn(txn_id, agent_id, amount):
+    return ComputeCreditTransaction(id=txn_id, agent_id=agent_id, action_type="dmf_evaluation", amount=amount)
+
+async def _test_child_draws_from_own_then_ancestors(db_path):
+    ledger = AtomicLedger(db_path=db_path)
+    await ledger.credit_accounts([("guild", 100.0), ("squad", 20.0), ("agent", 5.0)])
+    await ledger.set_parent("squad", "guild")
+    await ledger.set_parent("agent", "squad")
+
+    assert await ledger.get_available_balance("agent") == 125.0
+    assert await ledger.record_transaction(_txn("txn_1", "agent", 40.0))
+    assert await ledger.get_balance("agent") == 0.0
+    assert await ledger.get_balance("squad") == 0.0
+    assert await ledger.get_balance("guild") == 85.0
+
+    # Nothing is taken if the whole chain cannot cover the debit
+    assert not await ledger.record_transaction(_txn("txn_2", "agent", 90.0))
+    assert await ledger.get_balance("guild") == 85.0
+
+    with pytest.raises(ValueError):
+        await ledger.set_parent("guild", "agent")
+
+    # Each account drawn on has its own debit entry
+    assert (await LedgerAuditor(ledger).run()).discrepancies == []
+
+async def _test_spend_caps_limit_pooled_draws(db_path):
+    banker = VoidBankerManager(db_path=db_path)
+    ledger = banker.ledger
+    await ledger.credit_account("squad", 100.0)
+    await ledger.set_parent("scout", "squad", spend_cap=15.0)
+
+    assert await banker.check_solvency("scout", required_cc=15.0)
+    assert not await banker.check_solvency("scout", required_cc=16.0)
+    assert await ledger.record_transaction(_txn("txn_1", "scout", 10.0))
+    assert not await ledger.record_transaction(_txn("txn_2", "scout", 10.0))  # Cap leaves 5
+    assert await ledger.record_transaction(_txn("txn_3", "scout", 5.0))
+    assert await ledger.get_balance("squad") == 85.0
+
+    await ledger.remove_parent("scout")
+    assert await ledger.get_available_balance("scout") == 0.0
+
+async def _test_hierarchy_changes_reach_other_ledgers(db_path):
+    first = AtomicLedger(db_path=db_path)
+    second = AtomicLedger(db_path=db_path)
+    await first.credit_account("squad", 100.0)
+    await second.set_parent("child", "squad")
+    # first has never loaded the hierarchy for child, then sees the attach
+    assert await first.record_transaction(_txn("txn_1", "child", 10.0))
+
+    await second.remove_parent("child")
+    assert not await first.record_transaction(_txn("txn_2", "child", 10.0))
+    assert await first.get_balance("squad") == 90.0
+
+async def _test_requesting_agent_carries_the_entry(db_path):
+    ledger = AtomicLedger(db_path=db_path)
+    await ledger.credit_account("squad", 100.0)
+    await ledger.set_parent("child", "squad")
+    assert await ledger.record_transaction(_txn("txn_1", "child", 10.0))
+
+    with ledger._connect() as conn:
+        rows = conn.execute(
+            "SELECT id, agent_id, amount FROM transactions WHERE entry_type = 'debit' ORDER BY id"
+        ).fetchall()
+    assert rows == [("txn_1", "child", 0.0), ("txn_1_squad", "squad", 10.0)]
+
+def test_hierarchy_changes_reach_other_ledgers(tmp_path):
+    asyncio.run(_test_hierarchy_changes_reach_other_ledgers(str(tmp_path / "ledger.db")))
+
+def test_requesting_agent_carries_the_entry(tmp_path):
+    asyncio.run(_test_requesting_agent_carries_the_entry(str(tmp_path / "ledger.db")))
+
+def test_child_draws_from_own_then_ancestors(tmp_path):
+    asyncio.run(_test_child_draws_from_own_then_ancestors(str(tmp_path / "ledger.db")))
+
+def test_spend_caps_limit_pooled_draws(tmp_path):
+    asyncio.run(_test_spend_caps_limit_pooled_draws(str(tmp_path / "ledger.db")))
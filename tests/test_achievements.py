@@ -0,0 +1,112 @@
+
+import asyncio
+import sqlite3
+import pytest
+from vindicta_economy.achievements.engine import AchievementEngine, GameEvent
+from vindicta_economy.ledger.atomic_credits import AtomicLedger
+from vindicta_economy.models import Achievement, AchievementType
+
+def _definitions():
+    return [
+        Achievement(name="First Blood", description="Win a game",
+                    achievement_type=AchievementType.WINS, threshold=1, reward_amount=50),
+        Achievement(name="Veteran", description="Win three games",
+                    achievement_type=AchievementType.WINS, threshold=3, reward_amount=100),
+        Achievement(name="Hot Streak", description="Win five in a row",
+                    achievement_type=AchievementType.STREAK, threshold=5),
+    ]
+
+async def _test_progress_unlocks_and_rewards(db_path):
+    ledger = AtomicLedger(db_path=db_path)
+    engine = AchievementEngine(ledger, _definitions(), flush_threshold=10_000)
+
+    unlocks = await engine.process([
+        GameEvent("player_1", AchievementType.WINS),
+        GameEvent("player_1", AchievementType.GAMES_PLAYED),  # No matching definition
+        GameEvent("player_1", AchievementType.STREAK, amount=3),
+        GameEvent("player_1", AchievementType.STREAK, amount=2),  # Streak broken, best kept
+    ])
+    assert [u.name for u in unlocks] == ["First Blood"]
+    # Nothing is credited until the batch is flushed
+    assert await ledger.get_balance("player_1") == 0.0
+
+    unlocks = await engine.process([GameEvent("player_1", AchievementType.WINS, amount=2)])
+    assert [u.name for u in unlocks] == ["Veteran"]
+    await engine.flush()
+    assert await ledger.get_balance("player_1") == 150.0
+
+    progress = {a.name: a for a in engine.progress_for("player_1")}
+    assert progress["Veteran"].unlocked
+    assert progress["Hot Streak"].user_progress == 3
+    assert not progress["Hot Streak"].unlocked
+
+async def _test_progress_survives_restart(db_path):
+    ledger = AtomicLedger(db_path=db_path)
+    definitions = _definitions()
+    engine = AchievementEngine(ledger, definitions)
+    await engine.process([GameEvent("player_2", AchievementType.WINS)] * 2)
+    await engine.flush()
+
+    restarted = AchievementEngine(ledger, definitions)
+    unlocks = await restarted.process([GameEvent("player_2", AchievementType.WINS)])
+    await restarted.flush()
+    # First Blood was already unlocked and paid before the restart
+    assert [u.name for u in unlocks] == ["Veteran"]
+    assert await ledger.get_balance("player_2") == 150.0
+
+async def _test_failed_reward_credit_is_retried(db_path):
+    ledger = AtomicLedger(db_path=db_path)
+    definitions = _definitions()
+    engine = AchievementEngine(ledger, definitions)
+    await engine.process([GameEvent("player_3", AchievementType.WINS)])
+
+    credit_sync = ledger._credit_accounts_sync
+
+    def failing_credit(*args):
+        *head, extra_writes = args
+
+        def fail_after(conn):
+            extra_writes(conn)
+            raise sqlite3.OperationalError("disk I/O error")
+        return credit_sync(*head, fail_after)
+
+    ledger._credit_accounts_sync = failing_credit
+    with pytest.raises(sqlite3.OperationalError):
+        await engine.flush()
+    # Progress and reward were rolled back together
+    assert await ledger.get_balance("player_3") == 0.0
+    restarted = AchievementEngine(ledger, definitions)
+    await restarted.process([GameEvent("player_3", AchievementType.GAMES_PLAYED)])
+    assert not {a.name: a for a in restarted.progress_for("player_3")}["First Blood"].unlocked
+
+    ledger._credit_accounts_sync = credit_sync
+    assert [u.name for u in await engine.flush()] == ["First Blood"]
+    assert await ledger.get_balance("player_3") == 50.0
+
+async def _test_clean_users_are_evicted(db_path):
+    ledger = AtomicLedger(db_path=db_path)
+    engine = AchievementEngine(ledger, _definitions(), max_cached_users=2)
+    for i in range(3):
+        await engine.process([GameEvent(f"player_{i}", AchievementType.WINS)])
+    # Nothing flushed yet, so nobody can be dropped
+    assert len(engine._loaded_users) == 3
+    await engine.flush()
+    assert list(engine._loaded_users) == ["player_1", "player_2"]
+    assert all(user_id != "player_0" for user_id, _ in engine._progress)
+
+    # An evicted user is reloaded from the database
+    unlocks = await engine.process([GameEvent("player_0", AchievementType.WINS, amount=2)])
+    assert [u.name for u in unlocks] == ["Veteran"]
+    assert list(engine._loaded_users) == ["player_2", "player_0"]
+
+def test_progress_unlocks_and_rewards(tmp_path):
+    asyncio.run(_test_progress_unlocks_and_rewards(str(tmp_path / "ledger.db")))
+
+def test_progress_survives_restart(tmp_path):
+    asyncio.run(_test_progress_survives_restart(str(tmp_path / "ledger.db")))
+
+def test_failed_reward_credit_is_retried(tmp_path):
+    asyncio.run(_test_failed_reward_credit_is_retried(str(tmp_path / "ledger.db")))
+
+def test_clean_users_are_evicted(tmp_path):
+    asyncio.run(_test_clean_users_are_evicted(str(tmp_path / "ledger.db")))
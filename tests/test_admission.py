@@ -0,0 +1,105 @@
+
+import asyncio
+import time
+import pytest
+from vindicta_economy.governor.admission import AdmissionConfig, AdmissionController
+from vindicta_economy.governor.policy import PriorityLevel, ResourceExhaustionHalt, ResourcePolicy
+from vindicta_economy.ledger.atomic_credits import ComputeCreditTransaction
+from vindicta_economy.ledger.manager import VoidBankerManager
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+def _tick(controller, clock, latency):
+    controller.observe(latency, queue_depth=0)
+    clock.now += 1.0
+    controller.admit(PriorityLevel.SYSTEM_CRITICAL)  # Triggers the evaluation
+
+def test_sheds_lowest_priority_first_and_restores_it_last():
+    clock = FakeClock()
+    config = AdmissionConfig(target_p99_seconds=0.05, decrease_factor=0.5,
+                             increase_step=0.25, min_probability=0.1)
+    controller = AdmissionController(config, rng=lambda: 0.99, clock=clock)
+
+    for _ in range(5):
+        _tick(controller, clock, latency=0.2)
+    assert controller.probability(PriorityLevel.BACKGROUND_SIMULATION) == 0.1  # Floored
+    assert controller.probability(PriorityLevel.STANDARD_OPERATION) == 0.5
+    assert controller.probability(PriorityLevel.LIVE_GAME_STATE) == 1.0
+    assert not controller.admit(PriorityLevel.STANDARD_OPERATION)
+    assert controller.admit(PriorityLevel.SYSTEM_CRITICAL)
+
+    for _ in range(2):
+        _tick(controller, clock, latency=0.01)
+    assert controller.probability(PriorityLevel.STANDARD_OPERATION) == 1.0
+    assert controller.probability(PriorityLevel.BACKGROUND_SIMULATION) == 0.1
+
+    state = controller.snapshot()
+    assert state.p99_seconds == 0.01
+    assert state.shed["STANDARD_OPERATION"] == 1
+    assert state.decreases == 5 and state.increases == 2
+
+def test_queue_depth_alone_triggers_shedding():
+    clock = FakeClock()
+    controller = AdmissionController(AdmissionConfig(max_queue_depth=4), clock=clock)
+    controller.observe(0.001, queue_depth=10)
+    clock.now += 1.0
+    controller.admit(PriorityLevel.LIVE_GAME_STATE)
+    assert controller.probability(PriorityLevel.BACKGROUND_SIMULATION) < 1.0
+
+async def _test_policy_sheds_on_observed_ledger_latency():
+    clock = FakeClock()
+    banker = VoidBankerManager(db_path=":memory:")
+    controller = AdmissionController(
+        AdmissionConfig(target_p99_seconds=0.0, min_probability=0.0), rng=lambda: 0.5, clock=clock,
+    )
+    controller.attach(banker.ledger)
+    policy = ResourcePolicy(manager=banker, admission=controller)
+    await banker.grant_credits("sim", 1000.0)
+    for i in range(3):
+        assert await banker.ledger.record_transaction(ComputeCreditTransaction(
+            id=f"txn_{i}", agent_id="sim", action_type="dmf_evaluation", amount=1.0
+        ))
+    assert banker.ledger.pending_writes == 0
+
+    clock.now += 1.0  # Every observed write exceeded the zero target
+    with pytest.raises(ResourceExhaustionHalt) as excinfo:
+        await policy.enforce_policy("sim", PriorityLevel.BACKGROUND_SIMULATION, 5.0)
+    assert excinfo.value.reason == "ADAPTIVE SHEDDING"
+    assert str(excinfo.value).startswith("ADAPTIVE SHEDDING: ")
+    assert await policy.enforce_policy("sim", PriorityLevel.STANDARD_OPERATION, 5.0)
+
+    state = controller.snapshot()
+    assert state.p99_seconds is not None and state.p99_seconds > 0.0
+    assert state.probabilities["BACKGROUND_SIMULATION"] == 0.5
+
+async def _test_observed_latency_excludes_publishing():
+    banker = VoidBankerManager(db_path=":memory:")
+    observed = []
+    banker.ledger.add_latency_observer(lambda latency, depth: observed.append((latency, depth)))
+    emit = banker.ledger.feed.emit
+
+    def slow_emit(*args, **kwargs):
+        time.sleep(0.05)
+        return emit(*args, **kwargs)
+
+    banker.ledger.feed.emit = slow_emit
+    await banker.grant_credits("sim", 10.0)
+    assert len(observed) == 1
+    latency, depth = observed[0]
+    assert latency < 0.05 and depth == 0
+
+def test_policy_sheds_on_observed_ledger_latency():
+    asyncio.run(_test_policy_sheds_on_observed_ledger_latency())
+
+def test_observed_latency_excludes_publishing():
+    asyncio.run(_test_observed_latency_excludes_publishing())
+
+def test_halt_raised_with_message_only():
+    halt = ResourceExhaustionHalt("Custom guard tripped.")
+    assert str(halt) == "Custom guard tripped."
+    assert halt.reason == "UNSPECIFIED"
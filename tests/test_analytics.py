@@ -0,0 +1,138 @@
+
+import asyncio
+import time
+import pytest
+from vindicta_economy.ledger.analytics import LedgerAnalytics
+from vindicta_economy.ledger.atomic_credits import ENTRY_CREDIT, ENTRY_DEBIT, AtomicLedger, ComputeCreditTransaction
+from vindicta_economy.ledger.change_feed import LedgerEventType
+from vindicta_economy.ledger.currencies import CurrencyConversion
+from vindicta_economy.models import Currency, CurrencyType
+
+async def _spend(ledger, txn_id, agent_id, action_type, amount, timestamp=None):
+    assert await ledger.record_transaction(ComputeCreditTransaction(
+        id=txn_id, agent_id=agent_id, action_type=action_type, amount=amount,
+        timestamp=timestamp if timestamp is not None else time.time(),
+    ))
+
+async def _test_snapshot_then_incremental_updates(db_path):
+    ledger = AtomicLedger(db_path=db_path)
+    now = time.time()
+    await ledger.credit_accounts([("agent_a", 100.0), ("agent_b", 50.0), ("agent_c", 75.0)])
+    await _spend(ledger, "txn_1", "agent_a", "dmf_evaluation", 10.0, timestamp=now - 3600)
+    await _spend(ledger, "txn_2", "agent_b", "bsh_generation", 5.0)
+
+    analytics = LedgerAnalytics(ledger, bucket_seconds=60.0)
+    await analytics.start()
+    try:
+        assert analytics.top_balances(2) == [("agent_a", 90.0), ("agent_c", 75.0)]
+        assert analytics.spend_by_action() == {"dmf_evaluation": 10.0, "bsh_generation": 5.0}
+        assert analytics.spend_by_action(since=now - 60) == {"bsh_generation": 5.0}
+
+        # Changes after the snapshot arrive through the change feed
+        await ledger.transfer("agent_c", "agent_b", 60.0, transaction_id="xfer_1")
+        await _spend(ledger, "txn_3", "agent_b", "bsh_generation", 2.5)
+        await ledger.feed.drain()
+        await asyncio.sleep(0)
+        assert analytics.top_balances(2) == [("agent_b", 102.5), ("agent_a", 90.0)]
+        assert analytics.spend_by_action(since=now - 60) == {"bsh_generation": 7.5, "transfer": 60.0}
+
+        history = await analytics.agent_history("agent_b", limit=3)
+        assert [(e.transaction_id, e.entry_type) for e in history] == [
+            ("txn_3", ENTRY_DEBIT), ("xfer_1_cr", ENTRY_CREDIT), ("txn_2", ENTRY_DEBIT),
+        ]
+
+        # A refresh agrees with what was maintained incrementally
+        before = (analytics.top_balances(3), analytics.spend_by_action())
+        await analytics.refresh()
+        assert analytics.stats()["events_since_refresh"] == 0
+        assert analytics.top_balances(3) == before[0]
+        assert analytics.spend_by_action() == pytest.approx(before[1])
+        assert not analytics.stale
+    finally:
+        await analytics.aclose()
+
+async def _test_replica_is_detached_from_live_file(db_path):
+    ledger = AtomicLedger(db_path=db_path)
+    await ledger.credit_account("agent_a", 10.0)
+    analytics = LedgerAnalytics(ledger)
+    await analytics.refresh()
+    try:
+        # History reads the replica, not the live file
+        await ledger._run_sync(_drop_transactions, ledger)
+        history = await analytics.agent_history("agent_a")
+        assert [e.entry_type for e in history] == [ENTRY_CREDIT]
+    finally:
+        await analytics.aclose()
+
+async def _test_settlement_history_matches_stored_rows(db_path):
+    ledger = AtomicLedger(db_path=db_path, currencies=[
+        Currency(type=CurrencyType.PREMIUM, name="Premium Credits", symbol="PC", decimals=2),
+    ])
+    await ledger.credit_account("agent_a", 100.0)
+    analytics = LedgerAnalytics(ledger)
+    await analytics.start()
+    try:
+        assert await ledger.convert_currencies([
+            CurrencyConversion(agent_id="agent_a", from_currency="vindicta_credits",
+                               to_currency="premium", amount=10.0, rate=0.5),
+        ])
+        await ledger.feed.drain()
+        await asyncio.sleep(0)
+        live = await analytics.agent_history("agent_a", limit=2)
+        await analytics.refresh()
+        stored = await analytics.agent_history("agent_a", limit=2)
+        assert {(e.transaction_id, e.entry_type) for e in live} == {
+            (e.transaction_id, e.entry_type) for e in stored
+        }
+        assert any(e.transaction_id.endswith("_cr") for e in live)
+    finally:
+        await analytics.aclose()
+
+async def _test_refresh_overlapping_a_write(db_path):
+    ledger = AtomicLedger(db_path=db_path)
+    await ledger.credit_account("agent_a", 100.0)
+    analytics = LedgerAnalytics(ledger)
+    hidden = ComputeCreditTransaction(id="txn_hidden", agent_id="agent_a",
+                                      action_type="dmf_evaluation", amount=10.0)
+    try:
+        async with ledger._lock:
+            # A write holding the lock: committed, not yet published
+            balance = await ledger._run_sync(ledger._record_transaction_sync, hidden)
+            await asyncio.wait_for(analytics.refresh(), timeout=5.0)
+            ledger.feed.emit(LedgerEventType.DEBIT, "agent_a", 10.0, transaction_id="txn_hidden",
+                             action_type="dmf_evaluation", balance_after=balance)
+        await _spend(ledger, "txn_after", "agent_a", "dmf_evaluation", 2.5)
+        await ledger.feed.drain()
+        await asyncio.sleep(0)
+        # The copy already had txn_hidden, so its event is not applied twice
+        assert analytics.spend_by_action() == {"dmf_evaluation": 12.5}
+        assert analytics.top_balances(1) == [("agent_a", 87.5)]
+        history = await analytics.agent_history("agent_a", limit=3)
+        assert [e.transaction_id for e in history][:2] == ["txn_after", "txn_hidden"]
+    finally:
+        await analytics.aclose()
+
+def _drop_transactions(ledger):
+    with ledger._connect() as conn:
+        conn.execute("DELETE FROM transactions")
+
+def test_snapshot_then_incremental_updates(tmp_path):
+    asyncio.run(_test_snapshot_then_incremental_updates(str(tmp_path / "ledger.db")))
+
+def test_snapshot_of_in_memory_ledger():
+    asyncio.run(_test_snapshot_then_incremental_updates(":memory:"))
+
+def test_replica_is_detached_from_live_file(tmp_path):
+    asyncio.run(_test_replica_is_detached_from_live_file(str(tmp_path / "ledger.db")))
+
+def test_settlement_history_matches_stored_rows(tmp_path):
+    asyncio.run(_test_settlement_history_matches_stored_rows(str(tmp_path / "ledger.db")))
+
+def test_in_memory_settlement_history_matches_stored_rows():
+    asyncio.run(_test_settlement_history_matches_stored_rows(":memory:"))
+
+def test_refresh_overlapping_a_write(tmp_path):
+    asyncio.run(_test_refresh_overlapping_a_write(str(tmp_path / "ledger.db")))
+
+def test_in_memory_refresh_overlapping_a_write():
+    asyncio.run(_test_refresh_overlapping_a_write(":memory:"))
@@ -0,0 +1,92 @@
+
+import asyncio
+import sqlite3
+from vindicta_economy.ledger.atomic_credits import AtomicLedger, ComputeCreditTransaction
+from vindicta_economy.ledger.auditor import LedgerAuditor
+from vindicta_economy.ledger.currencies import CurrencyConversion
+
+async def _populate(ledger):
+    await ledger.credit_account("agent_a", 100.0)
+    await ledger.credit_accounts([("agent_b", 50.0), ("agent_c", 20.0), ("agent_d", 5.0)])
+    assert await ledger.record_transaction(ComputeCreditTransaction(
+        id="txn_1", agent_id="agent_a", action_type="dmf_evaluation", amount=5.0
+    ))
+    assert await ledger.transfer("agent_b", "agent_c", 10.0)
+    assert await ledger.convert_currencies([CurrencyConversion(
+        agent_id="agent_c", from_currency="vindicta_credits", to_currency="premium",
+        amount=10.0, rate=0.5,
+    )])
+
+async def _test_clean_ledger_reconciles(db_path):
+    ledger = AtomicLedger(db_path=db_path)
+    await _populate(ledger)
+    report = await LedgerAuditor(ledger).run()
+    assert report.complete
+    assert report.accounts_checked == 5  # agent_c holds two currencies
+    assert report.discrepancies == []
+
+async def _test_discrepancies_found_across_resumed_chunks(db_path):
+    ledger = AtomicLedger(db_path=db_path)
+    await _populate(ledger)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE accounts SET balance = balance + 7 WHERE agent_id = 'agent_d'")
+        conn.execute("""
+            INSERT INTO transactions (id, agent_id, currency, action_type, amount, timestamp, metadata)
+            VALUES ('orphan', 'agent_z', 'vindicta_credits', 'bsh_generation', 1.0, 0, '{}')
+        """)
+        conn.commit()
+
+    auditor = LedgerAuditor(ledger, chunk_size=2)
+    first = await auditor.run(max_chunks=1)
+    assert not first.complete
+    assert first.checkpoint == ("agent_b", "vindicta_credits")
+
+    rest = await auditor.run()
+    assert rest.complete
+    assert first.accounts_checked + rest.accounts_checked == 5
+    found = {(d.agent_id, d.difference) for d in first.discrepancies + rest.discrepancies}
+    assert found == {("agent_d", 7.0), ("agent_z", 1.0)}
+
+    # A finished sweep starts over next time
+    again = await auditor.run()
+    assert again.accounts_checked == 5
+
+async def _test_pre_credit_entry_ledger_reconciles(db_path):
+    # Schema v1: accounts per currency, but only debits were recorded
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE accounts (agent_id TEXT NOT NULL, currency TEXT NOT NULL, balance REAL NOT NULL,
+            last_updated REAL, PRIMARY KEY (agent_id, currency))
+        """)
+        conn.execute("""
+            CREATE TABLE transactions (id TEXT PRIMARY KEY, agent_id TEXT NOT NULL, currency TEXT NOT NULL,
+            action_type TEXT NOT NULL, amount REAL NOT NULL, timestamp REAL, metadata TEXT)
+        """)
+        conn.executemany("INSERT INTO accounts VALUES (?, ?, ?, ?)", [
+            ("agent_a", "vindicta_credits", 90.0, 50.0),
+            ("agent_b", "vindicta_credits", 20.0, 10.0),
+            ("agent_c", "vindicta_credits", 0.0, 10.0),
+        ])
+        conn.executemany("INSERT INTO transactions VALUES (?, ?, 'vindicta_credits', 'dmf_evaluation', ?, ?, '{}')", [
+            ("txn_1", "agent_a", 6.0, 30.0), ("txn_2", "agent_a", 4.0, 40.0),
+        ])
+        conn.execute("PRAGMA user_version = 1")
+        conn.commit()
+
+    ledger = AtomicLedger(db_path=db_path)
+    report = await LedgerAuditor(ledger).run()
+    assert report.accounts_checked == 3
+    assert report.discrepancies == []
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute(
+            "SELECT amount, timestamp FROM transactions WHERE agent_id = 'agent_a' AND entry_type = 'credit'"
+        ).fetchall() == [(100.0, 30.0)]
+
+def test_clean_ledger_reconciles(tmp_path):
+    asyncio.run(_test_clean_ledger_reconciles(str(tmp_path / "ledger.db")))
+
+def test_discrepancies_found_across_resumed_chunks(tmp_path):
+    asyncio.run(_test_discrepancies_found_across_resumed_chunks(str(tmp_path / "ledger.db")))
+
+def test_pre_credit_entry_ledger_reconciles(tmp_path):
+    asyncio.run(_test_pre_credit_entry_ledger_reconciles(str(tmp_path / "ledger.db")))
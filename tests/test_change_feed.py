@@ -0,0 +1,137 @@
+
+import asyncio
+import pytest
+from vindicta_economy.ledger.atomic_credits import AtomicLedger, ComputeCreditTransaction
+from vindicta_economy.ledger.change_feed import (
+    ChangeFeed,
+    LedgerEventType,
+    OverflowPolicy,
+    SequenceGapError,
+)
+
+async def _test_ledger_mutations_are_published(db_path):
+    ledger = AtomicLedger(db_path=db_path)
+    sub = ledger.feed.subscribe()
+
+    await ledger.credit_account("agent_a", 100.0)
+    assert await ledger.record_transaction(ComputeCreditTransaction(
+        id="txn_1", agent_id="agent_a", action_type="bsh_generation", amount=10.0
+    ))
+    assert await ledger.transfer("agent_a", "agent_b", 30.0, transaction_id="xfer_1")
+    # Refused operations publish nothing
+    assert not await ledger.transfer("agent_b", "agent_a", 1000.0)
+
+    events = [await sub.__anext__() for _ in range(3)]
+    assert [e.event_type for e in events] == [
+        LedgerEventType.CREDIT, LedgerEventType.DEBIT, LedgerEventType.TRANSFER
+    ]
+    assert [e.sequence for e in events] == [1, 2, 3]
+    assert events[1].balance_after == 90.0
+    assert events[2].counterparty_id == "agent_b"
+    assert events[2].balance_after == 60.0
+    assert events[2].counterparty_balance_after == 30.0
+    assert ledger.feed.last_sequence == 3
+    assert await ledger.get_balance("agent_b") == 30.0
+
+async def _test_drop_policies_and_resume():
+    feed = ChangeFeed(retention=5)
+    newest = feed.subscribe(maxsize=2, policy=OverflowPolicy.DROP_NEWEST)
+    oldest = feed.subscribe(maxsize=2, policy=OverflowPolicy.DROP_OLDEST)
+    for i in range(4):
+        await feed.publish(LedgerEventType.CREDIT, "agent", float(i))
+
+    assert newest.dropped == 2 and oldest.dropped == 2
+    assert [(await newest.__anext__()).sequence for _ in range(2)] == [1, 2]
+    assert [(await oldest.__anext__()).sequence for _ in range(2)] == [3, 4]
+
+    resumed = feed.subscribe(from_sequence=2)
+    await feed.publish(LedgerEventType.CREDIT, "agent", 5.0)
+    feed.close()
+    assert [e.sequence async for e in resumed] == [3, 4, 5]
+
+    for i in range(5):
+        await feed.publish(LedgerEventType.CREDIT, "agent", float(i))
+    with pytest.raises(SequenceGapError):
+        feed.subscribe(from_sequence=2)
+
+async def _test_block_policy_applies_backpressure():
+    feed = ChangeFeed()
+    sub = feed.subscribe(maxsize=1, policy=OverflowPolicy.BLOCK)
+    await feed.publish(LedgerEventType.CREDIT, "agent", 1.0)
+
+    blocked = asyncio.create_task(feed.publish(LedgerEventType.CREDIT, "agent", 2.0))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    assert (await sub.__anext__()).sequence == 1
+    await asyncio.wait_for(blocked, timeout=1.0)
+    assert (await sub.__anext__()).sequence == 2
+    assert sub.dropped == 0
+
+async def _test_stalled_subscriber_does_not_block_writes(db_path):
+    ledger = AtomicLedger(db_path=db_path)
+    stalled = ledger.feed.subscribe(maxsize=2, policy=OverflowPolicy.BLOCK, block_timeout=0.05)
+    live = ledger.feed.subscribe()
+    for i in range(5):
+        await asyncio.wait_for(ledger.credit_account(f"agent_{i}", 10.0), timeout=1.0)
+    await ledger.feed.drain()
+    assert stalled.dropped == 3
+    assert [(await live.__anext__()).sequence for _ in range(5)] == [1, 2, 3, 4, 5]
+    await asyncio.wait_for(ledger.aclose(), timeout=1.0)
+
+async def _test_stalled_subscriber_does_not_delay_others():
+    feed = ChangeFeed()
+    stalled = feed.subscribe(maxsize=1, policy=OverflowPolicy.BLOCK, block_timeout=None)
+    live = feed.subscribe(maxsize=100)
+    for i in range(20):
+        feed.emit(LedgerEventType.CREDIT, "agent", float(i))
+    # The live subscriber already has everything; the stalled one holds a bounded backlog
+    received = [await asyncio.wait_for(live.__anext__(), timeout=1.0) for _ in range(20)]
+    assert [e.sequence for e in received] == list(range(1, 21))
+    assert stalled._queue.qsize() == 1 and len(stalled._waiting) == 1
+    assert stalled.dropped == 18
+    feed.close()
+    assert [e.sequence async for e in stalled] == [1]
+
+async def _test_cancelled_write_is_still_published(db_path):
+    ledger = AtomicLedger(db_path=db_path)
+    await ledger.credit_account("agent_a", 10.0)
+    sub = ledger.feed.subscribe()
+    write = asyncio.create_task(ledger.credit_account("agent_a", 5.0))
+    await asyncio.sleep(0)  # The write is now running off the loop
+    write.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await write
+    # The commit went ahead, so its event did too
+    assert await ledger.get_balance("agent_a") == 15.0
+    event = await asyncio.wait_for(sub.__anext__(), timeout=1.0)
+    assert (event.sequence, event.balance_after) == (2, 15.0)
+
+async def _test_resume_ahead_of_feed_is_a_gap():
+    feed = ChangeFeed()
+    await feed.publish(LedgerEventType.CREDIT, "agent", 1.0)
+    # e.g. a position saved before a restart, when sequences began again at 1
+    with pytest.raises(SequenceGapError):
+        feed.subscribe(from_sequence=40)
+    assert [e.sequence for e in feed.subscribe(from_sequence=0)._backlog] == [1]
+
+def test_ledger_mutations_are_published(tmp_path):
+    asyncio.run(_test_ledger_mutations_are_published(str(tmp_path / "ledger.db")))
+
+def test_drop_policies_and_resume():
+    asyncio.run(_test_drop_policies_and_resume())
+
+def test_block_policy_applies_backpressure():
+    asyncio.run(_test_block_policy_applies_backpressure())
+
+def test_stalled_subscriber_does_not_block_writes(tmp_path):
+    asyncio.run(_test_stalled_subscriber_does_not_block_writes(str(tmp_path / "ledger.db")))
+
+def test_stalled_subscriber_does_not_delay_others():
+    asyncio.run(_test_stalled_subscriber_does_not_delay_others())
+
+def test_cancelled_write_is_still_published(tmp_path):
+    asyncio.run(_test_cancelled_write_is_still_published(str(tmp_path / "ledger.db")))
+
+def test_resume_ahead_of_feed_is_a_gap():
+    asyncio.run(_test_resume_ahead_of_feed_is_a_gap())
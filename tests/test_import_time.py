@@ -0,0 +1,45 @@
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Cold import of the policy module must stay well under this (seconds)
+IMPORT_BUDGET_SECONDS = 0.15
+
+SRC_DIR = str(Path(__file__).resolve().parents[1] / "src")
+
+def _probe(statement: str) -> dict:
+    """Run an import in a fresh interpreter and report its cost and side effects."""
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"{statement}\n"
+        "elapsed = time.perf_counter() - start\n"
+        "heavy = [m for m in ('pydantic', 'vindicta_foundation', 'sqlite3',\n"
+        "         'vindicta_economy.ledger.manager', 'vindicta_economy.models') if m in sys.modules]\n"
+        "print(json.dumps({'elapsed': elapsed, 'heavy': heavy}))\n"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [SRC_DIR, os.environ.get("PYTHONPATH")]))}
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+def test_package_import_is_lazy():
+    result = _probe("import vindicta_economy")
+    assert result["heavy"] == []
+
+def test_policy_import_stays_within_budget():
+    result = _probe("import vindicta_economy.governor.policy")
+    assert result["heavy"] == []
+    assert result["elapsed"] < IMPORT_BUDGET_SECONDS, (
+        f"Importing the policy module took {result['elapsed']:.3f}s "
+        f"(budget {IMPORT_BUDGET_SECONDS}s)"
+    )
+
+def test_manager_construction_does_no_io(tmp_path):
+    from vindicta_economy.ledger.manager import VoidBankerManager
+
+    db_path = tmp_path / "ledger.db"
+    VoidBankerManager(db_path=str(db_path))
+    assert not db_path.exists()
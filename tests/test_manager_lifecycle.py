@@ -0,0 +1,69 @@
+
+import asyncio
+import threading
+import pytest
+from vindicta_economy.governor.quotas import OperationType
+from vindicta_economy.ledger import atomic_credits
+from vindicta_economy.ledger.manager import VoidBankerManager
+
+async def _test_open_drains_pending_writes(db_path):
+    async with VoidBankerManager.open(db_path) as manager:
+        await manager.grant_credits("agent_a", 100.0)
+        purchases = [
+            asyncio.create_task(manager.purchase_operation("agent_a", OperationType.DMF_EVALUATION))
+            for _ in range(10)
+        ]
+        await asyncio.sleep(0)  # Let the purchases queue up before shutdown
+    # Shutdown waited for every queued purchase
+    assert all(p.done() for p in purchases)
+    assert all(p.result() for p in purchases)
+    with pytest.raises(RuntimeError):
+        await manager.grant_credits("agent_a", 1.0)
+    assert atomic_credits._writers == {}
+
+    async with VoidBankerManager.open(db_path) as manager:
+        assert await manager.ledger.get_balance("agent_a") == pytest.approx(50.0)
+
+def _run_manager_on_own_loop(db_path, agent_id, errors):
+    async def work():
+        async with VoidBankerManager.open(db_path) as manager:
+            await manager.grant_credits(agent_id, 100.0)
+            await manager.grant_credits("shared", 10.0)
+            for _ in range(10):
+                assert await manager.purchase_operation(agent_id, OperationType.DMF_EVALUATION)
+    try:
+        asyncio.run(work())
+    except Exception as exc:  # pragma: no cover - reported below
+        errors.append(exc)
+
+async def _shared_writer_balances(db_path):
+    async with VoidBankerManager.open(db_path) as manager:
+        assert await manager.ledger.get_balance("shared") == pytest.approx(40.0)
+        for i in range(4):
+            assert await manager.ledger.get_balance(f"agent_{i}") == pytest.approx(50.0)
+
+def test_open_drains_pending_writes(tmp_path):
+    asyncio.run(_test_open_drains_pending_writes(str(tmp_path / "ledger.db")))
+
+def test_managers_on_separate_loops_share_writer(tmp_path):
+    db_path = str(tmp_path / "ledger.db")
+    errors = []
+    threads = [
+        threading.Thread(target=_run_manager_on_own_loop, args=(db_path, f"agent_{i}", errors))
+        for i in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    asyncio.run(_shared_writer_balances(db_path))
+
+def test_get_instance_works_across_event_loops(tmp_path):
+    VoidBankerManager._instance = None
+    try:
+        first = asyncio.run(VoidBankerManager.get_instance(str(tmp_path / "ledger.db")))
+        second = asyncio.run(VoidBankerManager.get_instance(str(tmp_path / "ledger.db")))
+        assert first is second
+    finally:
+        VoidBankerManager._instance = None
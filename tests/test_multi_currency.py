@@ -0,0 +1,140 @@
+
+import asyncio
+import multiprocessing
+import sqlite3
+import pytest
+from vindicta_economy.ledger.atomic_credits import AtomicLedger, ComputeCreditTransaction
+from vindicta_economy.ledger.currencies import CurrencyConversion, CurrencyExchange
+from vindicta_economy.models import Currency, CurrencyType
+
+async def _test_balances_are_kept_per_currency(db_path):
+    ledger = AtomicLedger(db_path=db_path)
+    await ledger.credit_account("agent_a", 100.0)
+    await ledger.credit_account("agent_a", 5.0, currency=CurrencyType.PREMIUM)
+
+    assert await ledger.get_balance("agent_a") == 100.0
+    assert await ledger.get_balance("agent_a", CurrencyType.PREMIUM) == 5.0
+    assert await ledger.get_balances("agent_a") == {"vindicta_credits": 100.0, "premium": 5.0}
+
+    # A premium debit cannot draw on the default currency
+    assert not await ledger.record_transaction(ComputeCreditTransaction(
+        id="txn_p", agent_id="agent_a", action_type="cosmetic", amount=10.0,
+        currency=CurrencyType.PREMIUM,
+    ))
+    assert await ledger.transfer("agent_a", "agent_b", 2.0, currency=CurrencyType.PREMIUM)
+    assert await ledger.get_balance("agent_b", CurrencyType.PREMIUM) == 2.0
+    assert await ledger.get_balance("agent_b") == 0.0
+
+async def _test_self_settlement_needs_funds(db_path):
+    ledger = AtomicLedger(db_path=db_path)
+    # Nets to zero, but the debit leg alone is not covered
+    assert not await ledger.transfer("agent_z", "agent_z", 1e9)
+    assert not await ledger.exchange([
+        CurrencyExchange(agent_id="agent_z", counterparty_id="agent_z",
+                         give_currency="vindicta_credits", give_amount=5.0,
+                         receive_currency="vindicta_credits", receive_amount=5.0),
+    ])
+    assert not await ledger.convert_currencies([
+        CurrencyConversion(agent_id="agent_z", from_currency="vindicta_credits",
+                           to_currency="vindicta_credits", amount=10.0, rate=2.0),
+    ])
+    assert await ledger.get_balance("agent_z") == 0.0
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone() == (0,)
+
+async def _test_conversions_and_exchanges_settle_atomically(db_path):
+    ledger = AtomicLedger(db_path=db_path, currencies=[
+        Currency(type=CurrencyType.PREMIUM, name="Premium Credits", symbol="PC", decimals=2),
+    ])
+    await ledger.credit_account("agent_a", 100.0)
+    await ledger.credit_account("agent_b", 10.0)
+
+    ok = await ledger.convert_currencies([
+        CurrencyConversion(agent_id="agent_a", from_currency="vindicta_credits",
+                           to_currency="premium", amount=10.0, rate=0.0333),
+        CurrencyConversion(agent_id="agent_b", from_currency="vindicta_credits",
+                           to_currency="premium", amount=50.0, rate=0.0333),  # Insufficient
+    ])
+    assert not ok
+    assert await ledger.get_balance("agent_a") == 100.0
+    assert await ledger.get_balance("agent_a", CurrencyType.PREMIUM) == 0.0
+
+    assert await ledger.convert_currencies([
+        CurrencyConversion(agent_id="agent_a", from_currency="vindicta_credits",
+                           to_currency="premium", amount=10.0, rate=0.0333),
+    ])
+    assert await ledger.get_balance("agent_a") == 90.0
+    # Truncated to the currency's two decimals
+    assert await ledger.get_balance("agent_a", CurrencyType.PREMIUM) == 0.33
+
+    # A conversion too small to credit anything is rejected outright
+    with pytest.raises(ValueError):
+        await ledger.convert_currencies([
+            CurrencyConversion(agent_id="agent_a", from_currency="vindicta_credits",
+                               to_currency="premium", amount=0.1, rate=0.0333),
+        ])
+    assert await ledger.get_balance("agent_a") == 90.0
+
+    assert await ledger.exchange([
+        CurrencyExchange(agent_id="agent_a", counterparty_id="agent_b",
+                         give_currency="premium", give_amount=0.3,
+                         receive_currency="vindicta_credits", receive_amount=10.0),
+    ])
+    assert await ledger.get_balance("agent_a") == 100.0
+    assert await ledger.get_balance("agent_b") == 0.0
+    assert await ledger.get_balance("agent_b", CurrencyType.PREMIUM) == 0.3
+
+async def _test_legacy_schema_is_migrated(db_path):
+    _create_legacy_db(db_path)
+
+    ledger = AtomicLedger(db_path=db_path)
+    assert await ledger.get_balance("legacy_agent") == 42.0
+    await ledger.credit_account("legacy_agent", 1.0, currency=CurrencyType.PREMIUM)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT currency FROM transactions WHERE id = 'txn_old'").fetchone() == ("vindicta_credits",)
+
+def _create_legacy_db(db_path):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE accounts (agent_id TEXT PRIMARY KEY, balance REAL NOT NULL CHECK(balance >= 0), last_updated REAL)")
+        conn.execute("""
+            CREATE TABLE transactions (id TEXT PRIMARY KEY, agent_id TEXT NOT NULL, action_type TEXT NOT NULL,
+            amount REAL NOT NULL, timestamp REAL, metadata TEXT, FOREIGN KEY(agent_id) REFERENCES accounts(agent_id))
+        """)
+        conn.execute("INSERT INTO accounts VALUES ('legacy_agent', 42.0, 0)")
+        conn.execute("INSERT INTO transactions VALUES ('txn_old', 'legacy_agent', 'bsh_generation', 1.0, 0, '{}')")
+        conn.commit()
+
+def _open_legacy_db(db_path, start):
+    start.wait()
+    ledger = AtomicLedger(db_path=db_path)
+    assert asyncio.run(ledger.get_balance("legacy_agent")) == 42.0
+
+def test_concurrent_processes_migrate_once(tmp_path):
+    db_path = str(tmp_path / "ledger.db")
+    _create_legacy_db(db_path)
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+    start = context.Event()
+    workers = [context.Process(target=_open_legacy_db, args=(db_path, start)) for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    start.set()
+    for worker in workers:
+        worker.join(timeout=60)
+    assert [worker.exitcode for worker in workers] == [0] * 8
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM transactions WHERE action_type = 'opening_balance'").fetchone() == (1,)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert not {"accounts_v0", "transactions_v0"} & tables
+
+def test_balances_are_kept_per_currency(tmp_path):
+    asyncio.run(_test_balances_are_kept_per_currency(str(tmp_path / "ledger.db")))
+
+def test_self_settlement_needs_funds(tmp_path):
+    asyncio.run(_test_self_settlement_needs_funds(str(tmp_path / "ledger.db")))
+
+def test_conversions_and_exchanges_settle_atomically(tmp_path):
+    asyncio.run(_test_conversions_and_exchanges_settle_atomically(str(tmp_path / "ledger.db")))
+
+def test_legacy_schema_is_migrated(tmp_path):
+    asyncio.run(_test_legacy_schema_is_migrated(str(tmp_path / "ledger.db")))
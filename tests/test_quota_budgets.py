@@ -0,0 +1,79 @@
+
+import asyncio
+import pytest
+from vindicta_economy.governor.budgets import BudgetLimit, QuotaBudgets, RollingWindow
+from vindicta_economy.governor.policy import PriorityLevel, ResourceExhaustionHalt, ResourcePolicy
+from vindicta_economy.governor.quotas import OperationType
+from vindicta_economy.ledger.manager import VoidBankerManager
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_rolling_window_expires_old_buckets():
+    window = RollingWindow(window_seconds=60.0, buckets=6)
+    window.add(10.0, now=0.0)
+    window.add(5.0, now=30.0)
+    assert window.spent(now=59.0) == 15.0
+    assert window.spent(now=61.0) == 5.0  # First bucket slid out
+    assert window.spent(now=500.0) == 0.0
+
+async def _test_policy_halts_on_exhausted_window(db_path):
+    clock = FakeClock()
+    banker = VoidBankerManager(db_path=db_path)
+    banker.budgets = QuotaBudgets(
+        limits={OperationType.ORACLE_TRAINING_BATCH: BudgetLimit(limit_cc=1000.0, window_seconds=60.0)},
+        db_path=db_path, clock=clock,
+    )
+    policy = ResourcePolicy(manager=banker)
+    await banker.grant_credits("trainer", 5000.0)
+
+    for _ in range(2):
+        assert await policy.enforce_policy("trainer", PriorityLevel.STANDARD_OPERATION, 500.0,
+                                           op_type=OperationType.ORACLE_TRAINING_BATCH)
+        assert await banker.purchase_operation("trainer", OperationType.ORACLE_TRAINING_BATCH)
+
+    with pytest.raises(ResourceExhaustionHalt) as excinfo:
+        await policy.enforce_policy("trainer", PriorityLevel.STANDARD_OPERATION, 500.0,
+                                    op_type=OperationType.ORACLE_TRAINING_BATCH)
+    assert excinfo.value.reason == "QUOTA WINDOW EXHAUSTED"
+    assert "spent 1000.0 of 1000.0 CC" in str(excinfo.value)
+    # Other operations are unaffected
+    assert await policy.enforce_policy("trainer", PriorityLevel.STANDARD_OPERATION, 5.0,
+                                       op_type=OperationType.DMF_EVALUATION)
+
+    # Windows survive a restart once persisted
+    await banker.budgets.persist()
+    restored = QuotaBudgets(
+        limits={OperationType.ORACLE_TRAINING_BATCH: BudgetLimit(limit_cc=1000.0, window_seconds=60.0)},
+        db_path=db_path, clock=clock,
+    )
+    await restored.load()
+    assert restored.spent("trainer", OperationType.ORACLE_TRAINING_BATCH) == 1000.0
+
+    clock.now += 61.0
+    assert not restored.would_exceed("trainer", OperationType.ORACLE_TRAINING_BATCH, 500.0)
+
+async def _test_window_length_change_discards_saved_window(db_path):
+    clock = FakeClock(now=1_700_000_000.0)
+    op = OperationType.ORACLE_TRAINING_BATCH
+    saved = QuotaBudgets(limits={op: BudgetLimit(limit_cc=100.0, window_seconds=60.0)},
+                         db_path=db_path, clock=clock)
+    saved.record("trainer", op, 100.0)
+    await saved.persist()
+
+    clock.now += 30 * 86400.0
+    restored = QuotaBudgets(limits={op: BudgetLimit(limit_cc=100.0, window_seconds=3600.0)},
+                            db_path=db_path, clock=clock)
+    await restored.load()
+    # The saved epoch counted 1s buckets, not 60s ones
+    assert restored.spent("trainer", op) == 0.0
+
+def test_policy_halts_on_exhausted_window(tmp_path):
+    asyncio.run(_test_policy_halts_on_exhausted_window(str(tmp_path / "ledger.db")))
+
+def test_window_length_change_discards_saved_window(tmp_path):
+    asyncio.run(_test_window_length_change_discards_saved_window(str(tmp_path / "ledger.db")))